@@ -1,9 +1,14 @@
 """Main game loop and engine."""
 
-from datetime import datetime, timedelta
-from .state import GameState, Player, Location, Quest, Inventory
-from .response_schema import WorldEffect
-from typing import List
+from bisect import bisect_right
+from datetime import datetime
+from itertools import islice
+from .state import (
+    ConversationTurn, GameState, Player, Location, Quest, Inventory, HISTORY_WINDOW_MAX, HISTORY_WINDOW_KEEP,
+    intern_speeches
+)
+from .response_schema import WorldEffect, now_iso
+from typing import Dict, List, Optional
 
 # Import memory system (Phase 4)
 try:
@@ -12,6 +17,14 @@ try:
 except ImportError:
     MEMORY_AVAILABLE = False
 
+# Relationship score -> status: each threshold is the inclusive lower bound of
+# the next status (score >= 0.7 is "trusted ally", and so on).
+RELATIONSHIP_THRESHOLDS = (-0.7, -0.3, 0.3, 0.7)
+RELATIONSHIP_STATUSES = ("hostile", "unfriendly", "neutral", "friendly", "trusted ally")
+
+# NPC roles that remember the player's purchases
+_MERCHANT_ROLES = frozenset({'merchant', 'bartender', 'shopkeeper'})
+
 
 class GameEngine:
     """Main game engine that orchestrates turns and state updates."""
@@ -22,62 +35,85 @@ class GameEngine:
         # -1.0 = hostile, 0.0 = neutral, 1.0 = trusted ally
         if not hasattr(self.state, 'npc_relationships'):
             self.state.npc_relationships = {}
+        # Current Location object, re-resolved only when the location id or
+        # state changes
+        self._location_state = None
+        self._location_id = None
+        self._current_location = None
+        # Present / merchant NPC ids, rebuilt when the location, its npcs list
+        # or state.npcs is replaced, or on GameState.mark_world_changed
+        self._present_key = None
+        self._present_ids = ()
+        self._merchant_key = None
+        self._merchant_ids = frozenset()
+        # Turns that slid out of the history window and still need folding
+        # into state.history_summary (see GameCLI.refresh_history_summary)
+        self.unsummarized_turns: List[ConversationTurn] = []
+
+    def _present_npc_ids(self, location: Location) -> tuple:
+        """Ids in location.npcs that have NPC data, in location order."""
+        key = self.state.world_key(location, location.npcs, self.state.npcs)
+        if key != self._present_key:
+            self._present_key = key
+            self._present_ids = tuple(npc_id for npc_id in location.npcs if npc_id in self.state.npcs)
+        return self._present_ids
+
+    def _merchant_npc_ids(self) -> frozenset:
+        """Ids of NPCs whose role is in _MERCHANT_ROLES."""
+        key = self.state.world_key(self.state.npcs)
+        if key != self._merchant_key:
+            self._merchant_key = key
+            self._merchant_ids = frozenset(
+                npc_id for npc_id, npc in self.state.npcs.items()
+                if npc.get('role') in _MERCHANT_ROLES
+            )
+        return self._merchant_ids
+
+    def current_time(self) -> datetime:
+        """Current game time as a datetime."""
+        return self.state.current_time()
 
     def advance_time(self, minutes: int = 5):
         """Advance game time by specified minutes."""
-        current = datetime.fromisoformat(self.state.game_time)
-        new_time = current + timedelta(minutes=minutes)
-        self.state.game_time = new_time.isoformat()
+        self.state.advance_time(minutes)
 
-    def apply_effects(self, effects: WorldEffect, player_action: str = "", narration: str = "", npc_speeches: List[dict] = None) -> List[str]:
-        """
-        Apply DM response effects to game state.
-        
-        Args:
-            effects: WorldEffect object with state changes
-            player_action: What the player did this turn
-            narration: DM's narration for this turn
-            npc_speeches: List of NPC speeches this turn
-        
-        Returns:
-            List of log messages describing what changed.
-        """
-        log = []
-
-        # Location change
-        if effects.location and effects.location in self.state.locations:
-            old_loc = self.state.locations[self.state.current_location_id].name
-            self.state.current_location_id = effects.location
-            new_loc = self.state.locations[effects.location].name
+    def _apply_location(self, location: str, log: List[str], timestamp: str):
+        """Location change."""
+        if location in self.state.locations:
+            old_loc = self.get_current_location().name
+            self._set_current_location(location)
+            new_loc = self._current_location.name
             log.append(f"📍 Moved: {old_loc} → {new_loc}")
 
-        # Time advancement
-        if effects.time_delta:
-            self.advance_time(effects.time_delta)
-            log.append(f"⏰ Time: +{effects.time_delta} minutes")
-
-        # HP change
-        if effects.hp_change:
-            old_hp = self.state.player.hp
-            self.state.player.hp = max(0, min(self.state.player.max_hp, 
-                                              self.state.player.hp + effects.hp_change))
-            change_symbol = "+" if effects.hp_change > 0 else ""
-            log.append(f"❤️  HP: {old_hp} → {self.state.player.hp} ({change_symbol}{effects.hp_change})")
-
-        # Gold change
-        if effects.gold_change:
-            old_gold = self.state.player.gold
-            self.state.player.gold = max(0, self.state.player.gold + effects.gold_change)
-            change_symbol = "+" if effects.gold_change > 0 else ""
-            log.append(f"💰 Gold: {old_gold} → {self.state.player.gold} ({change_symbol}{effects.gold_change})")
-
-        # New items
-        for item_id in effects.new_items:
+    def _apply_time_delta(self, time_delta: int, log: List[str], timestamp: str):
+        """Time advancement."""
+        self.advance_time(time_delta)
+        log.append(f"⏰ Time: +{time_delta} minutes")
+
+    def _apply_hp_change(self, hp_change: int, log: List[str], timestamp: str):
+        """HP change."""
+        old_hp = self.state.player.hp
+        self.state.player.hp = max(0, min(self.state.player.max_hp, 
+                                          self.state.player.hp + hp_change))
+        change_symbol = "+" if hp_change > 0 else ""
+        log.append(f"❤️  HP: {old_hp} → {self.state.player.hp} ({change_symbol}{hp_change})")
+
+    def _apply_gold_change(self, gold_change: int, log: List[str], timestamp: str):
+        """Gold change."""
+        old_gold = self.state.player.gold
+        self.state.player.gold = max(0, self.state.player.gold + gold_change)
+        change_symbol = "+" if gold_change > 0 else ""
+        log.append(f"💰 Gold: {old_gold} → {self.state.player.gold} ({change_symbol}{gold_change})")
+
+    def _apply_new_items(self, new_items: List[str], log: List[str], timestamp: str):
+        """New items."""
+        for item_id in new_items:
             self.state.player.inventory.add_item(item_id, 1)
             log.append(f"📦 Gained: {item_id}")
 
-        # New quests
-        for quest_id in effects.new_quests:
+    def _apply_new_quests(self, new_quests: List[str], log: List[str], timestamp: str):
+        """New quests."""
+        for quest_id in new_quests:
             # Create basic quest if not already defined
             if quest_id not in self.state.active_quests:
                 new_quest = Quest(
@@ -85,13 +121,14 @@ class GameEngine:
                     title=quest_id.replace('_', ' ').title(),
                     description=f"New quest: {quest_id}",
                     giver_npc_id="unknown",
-                    started_at=datetime.now().isoformat()
+                    started_at=timestamp
                 )
                 self.state.active_quests[quest_id] = new_quest
                 log.append(f"📜 New Quest: {new_quest.title}")
 
-        # Completed quests
-        for quest_id in effects.completed_quests:
+    def _apply_completed_quests(self, completed_quests: List[str], log: List[str], timestamp: str):
+        """Completed quests."""
+        for quest_id in completed_quests:
             if quest_id in self.state.active_quests:
                 self.state.active_quests[quest_id].completed = True
                 quest_title = self.state.active_quests[quest_id].title
@@ -103,8 +140,9 @@ class GameEngine:
                     self.state.player.gold += reward
                     log.append(f"💰 Quest Reward: +{reward} gold")
 
-        # NPC relationship changes
-        for npc_id, delta in effects.npc_relationship_changes.items():
+    def _apply_relationship_changes(self, changes: Dict[str, float], log: List[str], timestamp: str):
+        """NPC relationship changes."""
+        for npc_id, delta in changes.items():
             if npc_id in self.state.npcs:
                 old_val = self.state.npc_relationships.get(npc_id, 0.0)
                 new_val = max(-1.0, min(1.0, old_val + delta))
@@ -114,16 +152,7 @@ class GameEngine:
                 change_symbol = "+" if delta > 0 else ""
                 
                 # Add relationship description
-                if new_val >= 0.7:
-                    status = "trusted ally"
-                elif new_val >= 0.3:
-                    status = "friendly"
-                elif new_val >= -0.3:
-                    status = "neutral"
-                elif new_val >= -0.7:
-                    status = "unfriendly"
-                else:
-                    status = "hostile"
+                status = RELATIONSHIP_STATUSES[bisect_right(RELATIONSHIP_THRESHOLDS, new_val)]
                 
                 log.append(f"🤝 {npc_name}: {change_symbol}{delta:.1f} ({status})")
                 
@@ -131,25 +160,69 @@ class GameEngine:
                 if 'last_interaction_turn' in self.state.npcs[npc_id]:
                     self.state.npcs[npc_id]['last_interaction_turn'] = self.state.turn
 
+    # WorldEffect field -> handler(engine, value, log, turn timestamp), applied
+    # in this order when the field is set
+    _EFFECT_HANDLERS = (
+        ("location", _apply_location),
+        ("time_delta", _apply_time_delta),
+        ("hp_change", _apply_hp_change),
+        ("gold_change", _apply_gold_change),
+        ("new_items", _apply_new_items),
+        ("new_quests", _apply_new_quests),
+        ("completed_quests", _apply_completed_quests),
+        ("npc_relationship_changes", _apply_relationship_changes),
+    )
+
+    def apply_effects(self, effects: WorldEffect, player_action: str = "", narration: str = "", npc_speeches: List[dict] = None,
+                      timestamp: Optional[str] = None) -> List[str]:
+        """
+        Apply DM response effects to game state.
+        
+        Args:
+            effects: WorldEffect object with state changes
+            player_action: What the player did this turn
+            narration: DM's narration for this turn
+            npc_speeches: List of NPC speeches this turn
+            timestamp: Wall-clock stamp shared by the records made this turn
+                (defaults to now)
+        
+        Returns:
+            List of log messages describing what changed.
+        """
+        log = []
+        timestamp = timestamp or now_iso()
+
+        # Dispatch only the populated effect fields
+        for attr, handler in self._EFFECT_HANDLERS:
+            value = getattr(effects, attr)
+            if value:
+                handler(self, value, log, timestamp)
+
         # Record conversation turn in history
         if player_action and narration:
-            from datetime import datetime
-            conversation_turn = {
-                'turn_number': self.state.turn,
-                'player_action': player_action,
-                'narration': narration,
-                'npc_speeches': npc_speeches or [],
-                'effects_summary': log.copy(),
-                'timestamp': datetime.now().isoformat()
-            }
-            self.state.conversation_history.append(conversation_turn)
+            conversation_turn = ConversationTurn(
+                turn_number=self.state.turn,
+                player_action=player_action,
+                narration=narration,
+                npc_speeches=intern_speeches(npc_speeches or []),
+                effects_summary=log.copy(),
+                timestamp=timestamp,
+                items_gained=list(effects.new_items)
+            )
+            history = self.state.conversation_history
+            if len(history) == history.maxlen:
+                # Bounded deque drops the oldest turn; keep the window anchored
+                self.state.history_window_start = max(0, self.state.history_window_start - 1)
+            history.append(conversation_turn)
             
-            # Keep only last 10 turns to avoid context overflow
-            if len(self.state.conversation_history) > 10:
-                self.state.conversation_history = self.state.conversation_history[-10:]
+            # Slide the prompt window only when it hits the upper bound
+            if len(history) - self.state.history_window_start >= HISTORY_WINDOW_MAX:
+                new_start = len(history) - HISTORY_WINDOW_KEEP
+                self.unsummarized_turns.extend(islice(history, self.state.history_window_start, new_start))
+                self.state.history_window_start = new_start
         
         # Create memories from significant events (Phase 4)
-        if MEMORY_AVAILABLE and self.state.memory_store:
+        if MEMORY_AVAILABLE:
             self.create_memories_from_events(effects, player_action, narration, npc_speeches or [])
 
         return log
@@ -164,15 +237,24 @@ class GameEngine:
             narration: DM's narration
             npc_speeches: List of NPC speeches
         """
-        if not MEMORY_AVAILABLE or not self.state.memory_store:
+        if not MEMORY_AVAILABLE:
             return
         
-        current_location = self.state.locations.get(self.state.current_location_id)
+        # Fast path: nothing below can fire on an uneventful, non-decay turn
+        if not (effects.completed_quests or effects.npc_relationship_changes
+                or effects.gold_change <= -10 or effects.hp_change < -5
+                or npc_speeches or self.state.turn % 10 == 0):
+            return
+        
+        current_location = self.get_current_location()
         if not current_location:
             return
         
-        npcs_present = current_location.npcs
-        current_time = datetime.fromisoformat(self.state.game_time)
+        npcs_present = self._present_npc_ids(current_location)
+        current_time = self.current_time()
+        
+        # Bound by the first memory actually written (which builds the store)
+        add_memory = None
         
         # 1. Quest completion memories (high importance)
         for quest_id in effects.completed_quests:
@@ -194,11 +276,12 @@ class GameEngine:
                         participants=["player", quest_giver],
                         decay_rate=0.05  # Very slow decay
                     )
-                    self.state.memory_store.add_memory(memory)
+                    add_memory = add_memory or self.state.memory_store.add_memory
+                    add_memory(memory)
                 
                 # All NPCs present learn about it (lower importance)
                 for npc_id in npcs_present:
-                    if npc_id != quest_giver and npc_id in self.state.npcs:
+                    if npc_id != quest_giver:
                         memory = SemanticMemory(
                             id=create_memory_id(),
                             memory_type="semantic",
@@ -210,7 +293,8 @@ class GameEngine:
                             confidence=0.9,
                             source="witnessed"
                         )
-                        self.state.memory_store.add_memory(memory)
+                        add_memory = add_memory or self.state.memory_store.add_memory
+                        add_memory(memory)
         
         # 2. Significant relationship changes (medium-high importance)
         for npc_id, delta in effects.npc_relationship_changes.items():
@@ -237,48 +321,49 @@ class GameEngine:
                     participants=["player", npc_id],
                     decay_rate=0.1
                 )
-                self.state.memory_store.add_memory(memory)
+                add_memory = add_memory or self.state.memory_store.add_memory
+                add_memory(memory)
         
         # 3. Commerce transactions (medium importance)
         if effects.gold_change < 0:  # Player spent money
             amount = abs(effects.gold_change)
             if amount >= 10:  # Significant purchase
+                merchant_ids = self._merchant_npc_ids()
                 for npc_id in npcs_present:
-                    if npc_id in self.state.npcs:
-                        npc = self.state.npcs[npc_id]
-                        if npc.get('role') in ['merchant', 'bartender', 'shopkeeper']:
-                            items_str = ", ".join(effects.new_items) if effects.new_items else "services"
-                            memory = EpisodicMemory(
-                                id=create_memory_id(),
-                                memory_type="episodic",
-                                text=f"The player bought {items_str} from me for {amount} gold",
-                                npc_id=npc_id,
-                                created_at=current_time,
-                                importance=min(0.7, amount / 50),  # Scale by amount
-                                emotion="neutral",
-                                location=self.state.current_location_id,
-                                participants=["player", npc_id],
-                                decay_rate=0.15  # Moderate decay
-                            )
-                            self.state.memory_store.add_memory(memory)
+                    if npc_id in merchant_ids:
+                        items_str = ", ".join(effects.new_items) if effects.new_items else "services"
+                        memory = EpisodicMemory(
+                            id=create_memory_id(),
+                            memory_type="episodic",
+                            text=f"The player bought {items_str} from me for {amount} gold",
+                            npc_id=npc_id,
+                            created_at=current_time,
+                            importance=min(0.7, amount / 50),  # Scale by amount
+                            emotion="neutral",
+                            location=self.state.current_location_id,
+                            participants=["player", npc_id],
+                            decay_rate=0.15  # Moderate decay
+                        )
+                        add_memory = add_memory or self.state.memory_store.add_memory
+                        add_memory(memory)
         
         # 4. Combat or HP changes (high importance)
         if effects.hp_change < -5:  # Significant damage
             for npc_id in npcs_present:
-                if npc_id in self.state.npcs:
-                    memory = EpisodicMemory(
-                        id=create_memory_id(),
-                        memory_type="episodic",
-                        text=f"I witnessed the player take {abs(effects.hp_change)} damage. {narration[:100]}",
-                        npc_id=npc_id,
-                        created_at=current_time,
-                        importance=min(0.8, abs(effects.hp_change) / 20),
-                        emotion="fear",
-                        location=self.state.current_location_id,
-                        participants=["player"] + list(npcs_present),
-                        decay_rate=0.1
-                    )
-                    self.state.memory_store.add_memory(memory)
+                memory = EpisodicMemory(
+                    id=create_memory_id(),
+                    memory_type="episodic",
+                    text=f"I witnessed the player take {abs(effects.hp_change)} damage. {narration[:100]}",
+                    npc_id=npc_id,
+                    created_at=current_time,
+                    importance=min(0.8, abs(effects.hp_change) / 20),
+                    emotion="fear",
+                    location=self.state.current_location_id,
+                    participants=["player"] + list(npcs_present),
+                    decay_rate=0.1
+                )
+                add_memory = add_memory or self.state.memory_store.add_memory
+                add_memory(memory)
         
         # 5. Significant conversation interactions (low-medium importance)
         # Create memories for NPCs who spoke this turn
@@ -301,14 +386,22 @@ class GameEngine:
                         participants=["player", npc_id],
                         decay_rate=0.2  # Faster decay for casual conversations
                     )
-                    self.state.memory_store.add_memory(memory)
+                    add_memory = add_memory or self.state.memory_store.add_memory
+                    add_memory(memory)
+        
+        store = self.state.existing_memory_store
+        if store is None:
+            return  # no memories yet: nothing to decay or index
         
         # 6. Run memory decay every 10 turns
         if self.state.turn % 10 == 0:
-            self.state.memory_store.decay_memories(current_time)
+            store.decay_memories(current_time)
             # Prune very weak memories
             if self.state.turn % 50 == 0:
-                self.state.memory_store.prune_weak_memories(threshold=0.1)
+                store.prune_weak_memories(threshold=0.1)
+        
+        # Index this turn's memories in the background while the narration is shown
+        store.flush(wait=False)
 
     def process_turn(self, player_action: str) -> str:
         """
@@ -319,7 +412,7 @@ class GameEngine:
         self.state.turn += 1
         
         # Log the action
-        self.state.world_events_log.append(f"Turn {self.state.turn}: Player action: {player_action}")
+        self.state.world_events_log.append((self.state.turn, "action", player_action))
         
         # Advance time
         self.advance_time(5)
@@ -328,7 +421,23 @@ class GameEngine:
 
     def get_current_location(self) -> Location:
         """Get the Location object for the player's current location."""
-        return self.state.locations.get(self.state.current_location_id)
+        state = self.state
+        if self._location_state is not state or self._location_id is not state.current_location_id:
+            # Location changed outside the engine (or state swapped): re-resolve
+            location = state.locations.get(state.current_location_id)
+            if location is None:
+                return None
+            self._location_state = state
+            self._location_id = state.current_location_id
+            self._current_location = location
+        return self._current_location
+
+    def _set_current_location(self, location_id: str):
+        """Move the player to location_id and update the cached Location."""
+        self.state.current_location_id = location_id
+        self._location_state = self.state
+        self._location_id = location_id
+        self._current_location = self.state.locations[location_id]
 
     def move_player(self, direction: str) -> bool:
         """
@@ -339,7 +448,10 @@ class GameEngine:
             return False
 
         new_location_id = current_loc.exits[direction]
-        self.state.current_location_id = new_location_id
+        if new_location_id in self.state.locations:
+            self._set_current_location(new_location_id)
+        else:
+            self.state.current_location_id = new_location_id
         return True
 
     def add_quest(self, quest: Quest):
@@ -2,11 +2,114 @@
 
 import json
 import re
-from typing import Optional
-from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from dataclasses import dataclass, field
+from typing import Dict, Optional
 
 from engine.state import GameState
-from engine.response_schema import DMResponse, NPCResponse, WorldEffect
+from engine.response_schema import DATACLASS_SLOTS, DMResponse, WorldEffect, now_iso
+
+# Optional single-pass decode + validation straight into the schema dataclasses
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+    _DM_DECODER = msgspec.json.Decoder(DMResponse)
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+# Optional fast JSON for the lenient decode path (orjson errors subclass
+# json.JSONDecodeError, so the handlers below catch both)
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+_JSON_RE = re.compile(r'\{.*\}', re.DOTALL)
+_SLUG_RE = re.compile(r"[^a-z0-9_]+")
+
+# effects_summary prefix written by GameEngine for gained items
+_ITEM_GAINED_PREFIX = '📦 Gained:'
+
+# NPC roles that should charge for items handed over
+_MERCHANT_ROLES = frozenset({'merchant', 'shopkeeper', 'bartender', 'vendor', 'trader'})
+
+
+@lru_cache(maxsize=4096)
+def _slug(s: str) -> str:
+    """Normalize a name or id for loose matching."""
+    return _SLUG_RE.sub("_", s.strip().lower()).strip("_")
+
+
+def _ensure_indexes(game_state: GameState) -> None:
+    """
+    Build name/slug -> id lookups for locations and NPCs on game_state.
+
+    Rebuilt whenever the locations or npcs dicts are replaced or
+    GameState.mark_world_changed is called; the first entry wins when
+    several share a name or slug.
+    """
+    key = game_state.world_key(game_state.locations, game_state.npcs)
+    if game_state._index_key == key:
+        return
+
+    loc_names: dict = {}
+    loc_slugs: dict = {}
+    for loc_id, loc in game_state.locations.items():
+        loc_names.setdefault(loc.name.strip().lower(), loc_id)
+        loc_slugs.setdefault(_slug(loc.name), loc_id)
+        loc_slugs.setdefault(_slug(loc_id), loc_id)
+
+    npc_names: dict = {}
+    npc_slugs: dict = {}
+    for npc_id, npc in game_state.npcs.items():
+        npc_name = str(npc.get("name", "")).strip().lower()
+        npc_names.setdefault(npc_name, npc_id)
+        npc_slugs.setdefault(_slug(npc_name), npc_id)
+        npc_slugs.setdefault(_slug(npc_id), npc_id)
+
+    game_state._loc_name_index = loc_names
+    game_state._loc_slug_index = loc_slugs
+    game_state._npc_name_index = npc_names
+    game_state._npc_slug_index = npc_slugs
+    game_state._index_key = key
+
+
+def _scan_json_object(text: str) -> Optional[str]:
+    """
+    Return the first balanced JSON-looking {...} object in text, or None.
+
+    Tracks brace depth in a single pass, ignoring braces inside string
+    literals. Brace groups in prose that don't open with a key (e.g.
+    "{not json}") are skipped.
+    """
+    start = text.find('{')
+    while start >= 0:
+        if text[start + 1:].lstrip()[:1] in ('"', '}'):
+            depth = 0
+            in_string = False
+            escaped = False
+            for i in range(start, len(text)):
+                ch = text[i]
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif ch == '\\':
+                        escaped = True
+                    elif ch == '"':
+                        in_string = False
+                elif ch == '"':
+                    in_string = True
+                elif ch == '{':
+                    depth += 1
+                elif ch == '}':
+                    depth -= 1
+                    if depth == 0:
+                        return text[start:i + 1]
+            return None
+        start = text.find('{', start + 1)
+    return None
 
 
 class ResponseParser:
@@ -19,14 +122,30 @@ class ResponseParser:
         
         Handles cases where LLM adds extra text before/after JSON.
         """
-        # Try to find JSON block with curly braces
-        match = re.search(r'\{.*\}', text, re.DOTALL)
+        # Scan for the first balanced JSON object
+        obj = _scan_json_object(text)
+        if obj:
+            return obj
+
+        # Unbalanced braces (e.g. truncated output): take the widest block
+        match = _JSON_RE.search(text)
         if match:
             return match.group(0)
         
         # If no match, return text as-is and let JSON parser try
         return text.strip()
 
+    @staticmethod
+    def _decode(json_str: str) -> DMResponse:
+        """Decode a JSON object string into a DMResponse; raises on invalid JSON."""
+        if MSGSPEC_AVAILABLE:
+            try:
+                return _DM_DECODER.decode(json_str)
+            except msgspec.MsgspecError:
+                pass  # Missing/mistyped fields: retry with the lenient path below
+
+        return DMResponse.from_dict(_json_loads(json_str))
+
     @staticmethod
     def parse_response(text: str) -> Optional[DMResponse]:
         """
@@ -35,16 +154,20 @@ class ResponseParser:
         Returns None if parsing fails.
         """
         try:
+            # Fast path: the model returned a bare JSON object as instructed
+            stripped = text.strip()
+            if stripped.startswith('{') and stripped.endswith('}'):
+                try:
+                    return ResponseParser._decode(stripped)
+                except ValueError:
+                    pass  # e.g. two objects or prose between braces; scan below
+
             # Extract JSON
             json_str = ResponseParser.extract_json(text)
             if not json_str:
                 return None
-            
-            # Parse JSON
-            data = json.loads(json_str)
-            
-            # Convert to DMResponse
-            return DMResponse.from_dict(data)
+
+            return ResponseParser._decode(json_str)
             
         except json.JSONDecodeError as e:
             print(f"[JSON Parse Error: {e}]")
@@ -54,80 +177,92 @@ class ResponseParser:
             return None
 
     @staticmethod
-    def create_fallback_response(player_action: str) -> DMResponse:
+    def create_fallback_response(player_action: str, timestamp: Optional[str] = None) -> DMResponse:
         """
         Create a fallback response when parsing fails.
+
+        Pass the turn's timestamp to avoid formatting a new one.
         """
         return DMResponse(
             narration=f"You attempt to {player_action}. The world shimmers mysteriously as reality adjusts.",
             npc_speeches=[],
             effects=WorldEffect(time_delta=5),
             suggested_options=["Try something else", "Look around", "Wait and see"],
-            timestamp=datetime.now().isoformat()
+            timestamp=timestamp or now_iso()
         )
 
 
+@dataclass(**DATACLASS_SLOTS)
+class ResolutionContext:
+    """Ids referenced by a DMResponse, resolved once for validation and sanitizing."""
+    resolved_location: Optional[str] = None
+    resolved_npcs: Dict[str, Optional[str]] = field(default_factory=dict)  # raw or resolved id -> id or None
+
+
 class ResponseValidator:
     """Validator for ensuring DMResponse is consistent with game state."""
 
     @staticmethod
     def _find_location_id(candidate: Optional[str], game_state: GameState) -> Optional[str]:
         """Resolve a location id from either an id or a location name (case-insensitive)."""
-        def _slug(s: str) -> str:
-            return re.sub(r"[^a-z0-9_]+", "_", s.strip().lower()).strip("_")
-
         if not candidate:
             return None
         if candidate in game_state.locations:
             return candidate
 
-        normalized = candidate.strip().lower()
-        slug_candidate = _slug(candidate)
-        for loc_id, loc in game_state.locations.items():
-            if loc.name.strip().lower() == normalized:
-                return loc_id
-            if _slug(loc.name) == slug_candidate:
-                return loc_id
-            if _slug(loc_id) == slug_candidate:
-                return loc_id
-        return None
+        _ensure_indexes(game_state)
+        loc_id = game_state._loc_name_index.get(candidate.strip().lower())
+        if loc_id is None:
+            loc_id = game_state._loc_slug_index.get(_slug(candidate))
+        return loc_id
 
     @staticmethod
     def _find_npc_id(candidate: Optional[str], game_state: GameState) -> Optional[str]:
         """Resolve an NPC id from either an id or an NPC name (case-insensitive)."""
-        def _slug(s: str) -> str:
-            return re.sub(r"[^a-z0-9_]+", "_", s.strip().lower()).strip("_")
-
         if not candidate:
             return None
         if candidate in game_state.npcs:
             return candidate
 
-        normalized = candidate.strip().lower()
-        slug_candidate = _slug(candidate)
-        for npc_id, npc in game_state.npcs.items():
-            npc_name = str(npc.get("name", "")).strip().lower()
-            if npc_name == normalized:
-                return npc_id
-            if _slug(npc_name) == slug_candidate:
-                return npc_id
-            if _slug(npc_id) == slug_candidate:
-                return npc_id
-        return None
+        _ensure_indexes(game_state)
+        npc_id = game_state._npc_name_index.get(candidate.strip().lower())
+        if npc_id is None:
+            npc_id = game_state._npc_slug_index.get(_slug(candidate))
+        return npc_id
+
+    @staticmethod
+    def prepare_response(response: DMResponse, game_state: GameState) -> ResolutionContext:
+        """Resolve the location and every NPC id referenced by the response in one pass."""
+        raw_ids = {speech.npc_id for speech in response.npc_speeches}
+        raw_ids.update(response.effects.npc_relationship_changes)
+        resolved_npcs = {raw_id: ResponseValidator._find_npc_id(raw_id, game_state) for raw_id in raw_ids}
+        # validate_dm_response rewrites ids in place; map resolved ids to themselves
+        resolved_npcs.update({npc_id: npc_id for npc_id in list(resolved_npcs.values()) if npc_id})
+        return ResolutionContext(
+            resolved_location=ResponseValidator._find_location_id(response.effects.location, game_state),
+            resolved_npcs=resolved_npcs,
+        )
 
     @staticmethod
-    def validate_dm_response(response: DMResponse, game_state: GameState) -> tuple[bool, list[str]]:
+    def validate_dm_response(response: DMResponse, game_state: GameState,
+                             context: Optional[ResolutionContext] = None) -> tuple[bool, list[str]]:
         """
         Validate DMResponse against game state.
+
+        Pass the same context from prepare_response to sanitize_effects to
+        reuse the id resolution.
         
         Returns:
             (is_valid, list_of_issues)
         """
+        if context is None:
+            context = ResponseValidator.prepare_response(response, game_state)
+        resolved_npcs = context.resolved_npcs
         issues = []
         
         # Validate location
         if response.effects.location:
-            resolved_location = ResponseValidator._find_location_id(response.effects.location, game_state)
+            resolved_location = context.resolved_location
             if not resolved_location:
                 issues.append(f"Invalid location: {response.effects.location}")
             else:
@@ -135,7 +270,7 @@ class ResponseValidator:
         
         # Validate NPCs
         for npc_speech in response.npc_speeches:
-            resolved_npc = ResponseValidator._find_npc_id(npc_speech.npc_id, game_state)
+            resolved_npc = resolved_npcs[npc_speech.npc_id]
             if not resolved_npc:
                 issues.append(f"Invalid NPC ID: {npc_speech.npc_id}")
             else:
@@ -144,7 +279,7 @@ class ResponseValidator:
         # Validate NPC relationships
         cleaned_relationships = {}
         for npc_id, delta in response.effects.npc_relationship_changes.items():
-            resolved_npc = ResponseValidator._find_npc_id(npc_id, game_state)
+            resolved_npc = resolved_npcs[npc_id]
             if not resolved_npc:
                 issues.append(f"Invalid NPC in relationship changes: {npc_id}")
                 continue
@@ -154,8 +289,9 @@ class ResponseValidator:
         response.effects.npc_relationship_changes = cleaned_relationships
         
         # Validate quests
+        active_qids = game_state.active_quests.keys()
         for quest_id in response.effects.completed_quests:
-            if quest_id not in game_state.active_quests:
+            if quest_id not in active_qids:
                 issues.append(f"Cannot complete non-existent quest: {quest_id}")
         
         # Validate HP change doesn't go below 0 or above max
@@ -176,42 +312,46 @@ class ResponseValidator:
                 for npc_id in current_location.npcs:
                     npc = game_state.npcs.get(npc_id, {})
                     role = npc.get('role', '').lower()
-                    if role in ['merchant', 'shopkeeper', 'bartender', 'vendor', 'trader']:
+                    if role in _MERCHANT_ROLES:
                         issues.append(f"WARNING: Receiving items from {role} without gold cost. Items should be paid for!")
                         break
         
         # Check for duplicate transactions in recent history
         if response.effects.new_items and response.effects.gold_change < 0:
             # Look at last 2 turns to see if same item was already purchased
-            recent_turns = game_state.conversation_history[-2:] if game_state.conversation_history else []
-            for turn in recent_turns:
-                turn_items = set()
-                # Parse effects_summary to find items
-                for effect in turn.get('effects_summary', []):
-                    if '📦 Gained:' in effect:
-                        item = effect.split('📦 Gained:')[1].strip()
-                        turn_items.add(item)
-                
-                # Check for overlap
-                current_items = set(response.effects.new_items)
-                overlap = turn_items & current_items
-                if overlap:
-                    issues.append(f"WARNING: Possible duplicate purchase - {', '.join(overlap)} was already received in recent turns")
+            history = game_state.conversation_history
+            recently_gained = set()
+            for turn in islice(reversed(history), 2):
+                items = turn.items_gained
+                if items is None:
+                    # Turns saved before items_gained existed: parse the summary
+                    items = [effect.split(_ITEM_GAINED_PREFIX, 1)[1].strip()
+                             for effect in turn.effects_summary
+                             if _ITEM_GAINED_PREFIX in effect]
+                recently_gained.update(items)
+
+            overlap = recently_gained.intersection(response.effects.new_items)
+            if overlap:
+                issues.append(f"WARNING: Possible duplicate purchase - {', '.join(sorted(overlap))} was already received in recent turns")
         
         return len(issues) == 0, issues
 
     @staticmethod
-    def sanitize_effects(response: DMResponse, game_state: GameState) -> DMResponse:
+    def sanitize_effects(response: DMResponse, game_state: GameState,
+                         context: Optional[ResolutionContext] = None) -> DMResponse:
         """
         Sanitize and fix common issues in DMResponse.
         
         Returns a corrected DMResponse.
         """
+        if context is None:
+            context = ResponseValidator.prepare_response(response, game_state)
+        resolved_npcs = context.resolved_npcs
         effects = response.effects
         
         # Fix location if invalid
         if effects.location:
-            resolved_location = ResponseValidator._find_location_id(effects.location, game_state)
+            resolved_location = context.resolved_location
             if resolved_location:
                 effects.location = resolved_location
             else:
@@ -221,7 +361,7 @@ class ResponseValidator:
         # Remove invalid NPCs from speeches
         valid_speeches = []
         for npc in response.npc_speeches:
-            resolved_npc = ResponseValidator._find_npc_id(npc.npc_id, game_state)
+            resolved_npc = resolved_npcs[npc.npc_id]
             if resolved_npc:
                 npc.npc_id = resolved_npc
                 valid_speeches.append(npc)
@@ -232,7 +372,7 @@ class ResponseValidator:
         # Clamp relationship changes
         sanitized_relationships = {}
         for npc_id, delta in effects.npc_relationship_changes.items():
-            resolved_npc = ResponseValidator._find_npc_id(npc_id, game_state)
+            resolved_npc = resolved_npcs[npc_id]
             if resolved_npc:
                 clamped = max(-1.0, min(1.0, delta))
                 sanitized_relationships[resolved_npc] = clamped
@@ -240,11 +380,12 @@ class ResponseValidator:
                     print(f"[Sanitizing: Clamped relationship change for {resolved_npc}: {delta} -> {clamped}]")
         effects.npc_relationship_changes = sanitized_relationships
         
-        # Remove completed quests that don't exist
-        valid_completed = [
+        # Remove completed quests that don't exist (and duplicates, keeping order)
+        active_qids = game_state.active_quests.keys()
+        valid_completed = list(dict.fromkeys(
             qid for qid in effects.completed_quests
-            if qid in game_state.active_quests
-        ]
+            if qid in active_qids
+        ))
         if len(valid_completed) != len(effects.completed_quests):
             print(f"[Sanitizing: Removed invalid completed quests]")
             effects.completed_quests = valid_completed
@@ -1,19 +1,47 @@
 """Schema definitions for structured DM responses."""
 
+import sys
+import time
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Dict, List, Optional
 
+# Slotted dataclasses (3.10+) drop the per-instance __dict__. memory/types keeps
+# its own copy: importing engine from there would close an import cycle, and
+# importing memory from here would load the whole memory store
+DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
 
-@dataclass
+_now_second = None
+_now_text = ""
+
+
+def now_iso() -> str:
+    """Local wall-clock time as an ISO string, to the second.
+
+    Formatting is cached per second, so the many records created within
+    one turn share a single datetime/isoformat call.
+    """
+    global _now_second, _now_text
+    second = int(time.time())
+    if second != _now_second:
+        _now_second = second
+        _now_text = datetime.fromtimestamp(second).isoformat()
+    return _now_text
+
+
+@dataclass(**DATACLASS_SLOTS)
 class NPCResponse:
     """Represents a single NPC's speech or reaction."""
     npc_id: str
     text: str
     emotion: str = "neutral"  # joy, fear, anger, sadness, surprise, neutral, etc.
 
+    def to_dict(self) -> dict:
+        """Convert to dictionary."""
+        return {'npc_id': self.npc_id, 'text': self.text, 'emotion': self.emotion}
+
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class WorldEffect:
     """Effects that change game state."""
     location: Optional[str] = None              # Move player to this location_id
@@ -26,23 +54,20 @@ class WorldEffect:
     npc_relationship_changes: Dict[str, float] = field(default_factory=dict)  # npc_id -> delta (-1.0 to 1.0)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class DMResponse:
     """Complete structured response from the DM."""
     narration: str                                      # Main narrative text
     npc_speeches: List[NPCResponse] = field(default_factory=list)  # NPC dialogues
     effects: WorldEffect = field(default_factory=WorldEffect)      # State changes
     suggested_options: List[str] = field(default_factory=list)     # Suggested player actions
-    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())  # When generated
+    timestamp: str = field(default_factory=now_iso)  # When generated
 
     def to_dict(self) -> dict:
         """Convert to dictionary."""
         return {
             'narration': self.narration,
-            'npc_speeches': [
-                {'npc_id': npc.npc_id, 'text': npc.text, 'emotion': npc.emotion}
-                for npc in self.npc_speeches
-            ],
+            'npc_speeches': [npc.to_dict() for npc in self.npc_speeches],
             'effects': {
                 'location': self.effects.location,
                 'time_delta': self.effects.time_delta,
@@ -79,5 +104,5 @@ class DMResponse:
             npc_speeches=npc_speeches,
             effects=effects,
             suggested_options=data.get('suggested_options', []),
-            timestamp=data.get('timestamp', datetime.now().isoformat()),
+            timestamp=data['timestamp'] if 'timestamp' in data else now_iso(),
         )
@@ -1,21 +1,88 @@
 """Game state models for the D&D engine."""
 
-from dataclasses import dataclass, field, asdict
-from datetime import datetime
-from typing import Dict, List, Optional
+from collections import deque
+from dataclasses import InitVar, dataclass, field
+from itertools import islice
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional
+import hashlib
 import json
 import os
+import sys
+
+from engine.response_schema import DATACLASS_SLOTS
 
 # Import memory system (Phase 4)
 try:
-    from memory.memory_store import MemoryStore
+    from memory.memory_store import MemoryStore, MSGSPEC_AVAILABLE
     MEMORY_AVAILABLE = True
 except ImportError:
     MEMORY_AVAILABLE = False
+    MSGSPEC_AVAILABLE = False
     MemoryStore = None
 
+# Optional fast JSON for save/load
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Conversation window sent to the LLM: grows append-only up to HISTORY_WINDOW_MAX
+# turns, then restarts from the last HISTORY_WINDOW_KEEP turns. Between resets the
+# serialized history is a stable prefix, which keeps prompt caches warm. Stored
+# history is bounded to the same size, so older turns fall off automatically.
+HISTORY_WINDOW_MAX = 20
+HISTORY_WINDOW_KEEP = 10
+
+# Bound on GameState.world_events_log
+WORLD_EVENTS_MAX = 1000
+
+
+def format_world_event(event) -> str:
+    """Render a world_events_log entry.
+
+    Entries are stored unformatted as (turn, kind, payload) tuples and only
+    rendered when read; entries loaded from saves are already strings.
+    """
+    if isinstance(event, str):
+        return event
+    turn, kind, payload = event
+    if kind == "action":
+        return f"Turn {turn}: Player action: {payload}"
+    return f"Turn {turn}: {payload}"
+
+
+def intern_npc_ids(npcs: Dict[str, dict], locations: Dict[str, "Location"]) -> Dict[str, dict]:
+    """Intern NPC ids and roles so repeated lookups compare by identity.
+
+    Returns the NPC dict re-keyed with interned ids; location NPC lists are
+    updated in place to reference the same string objects.
+    """
+    interned = {}
+    for npc_id, npc in npcs.items():
+        if isinstance(npc.get('role'), str):
+            npc['role'] = sys.intern(npc['role'])
+        interned[sys.intern(npc_id)] = npc
+    for location in locations.values():
+        location.npcs = [sys.intern(npc_id) for npc_id in location.npcs]
+    return interned
+
 
-@dataclass
+def intern_speeches(speeches: List[dict]) -> List[dict]:
+    """Intern the npc_id and emotion of NPC speech dicts in place.
+
+    Both repeat across every turn of the conversation history.
+    """
+    for speech in speeches:
+        for key in ('npc_id', 'emotion'):
+            value = speech.get(key)
+            if isinstance(value, str):
+                speech[key] = sys.intern(value)
+    return speeches
+
+
+@dataclass(**DATACLASS_SLOTS)
 class Location:
     """Represents a location in the game world."""
     id: str
@@ -26,14 +93,21 @@ class Location:
     items: List[str] = field(default_factory=list)  # Item IDs present
 
     def to_dict(self):
-        return asdict(self)
+        return {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'exits': self.exits,
+            'npcs': self.npcs,
+            'items': self.items
+        }
 
     @classmethod
     def from_dict(cls, data):
         return cls(**data)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class Quest:
     """Represents a quest."""
     id: str
@@ -46,14 +120,23 @@ class Quest:
     started_at: Optional[str] = None
 
     def to_dict(self):
-        return asdict(self)
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'giver_npc_id': self.giver_npc_id,
+            'objectives': self.objectives,
+            'completed': self.completed,
+            'reward_gold': self.reward_gold,
+            'started_at': self.started_at
+        }
 
     @classmethod
     def from_dict(cls, data):
         return cls(**data)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class Inventory:
     """Represents a player inventory."""
     items: Dict[str, int] = field(default_factory=dict)  # item_id -> quantity
@@ -74,14 +157,18 @@ class Inventory:
         return True
 
     def to_dict(self):
-        return asdict(self)
+        return {
+            'items': self.items,
+            'max_weight': self.max_weight,
+            'current_weight': self.current_weight
+        }
 
     @classmethod
     def from_dict(cls, data):
         return cls(**data)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class Player:
     """Represents the player character."""
     name: str
@@ -94,9 +181,16 @@ class Player:
     inventory: Inventory = field(default_factory=Inventory)
 
     def to_dict(self):
-        data = asdict(self)
-        data['inventory'] = self.inventory.to_dict()
-        return data
+        return {
+            'name': self.name,
+            'class_name': self.class_name,
+            'level': self.level,
+            'hp': self.hp,
+            'max_hp': self.max_hp,
+            'experience': self.experience,
+            'gold': self.gold,
+            'inventory': self.inventory.to_dict()
+        }
 
     @classmethod
     def from_dict(cls, data):
@@ -106,7 +200,7 @@ class Player:
         return player
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class ConversationTurn:
     """Represents a single conversation turn."""
     turn_number: int
@@ -115,6 +209,7 @@ class ConversationTurn:
     npc_speeches: List[dict]  # [{"npc_id": "...", "text": "...", "emotion": "..."}]
     effects_summary: List[str]  # Brief summary of state changes
     timestamp: str  # ISO format
+    items_gained: Optional[List[str]] = None  # Item ids added this turn (None in turns saved before it existed)
 
     def to_dict(self):
         return {
@@ -123,34 +218,129 @@ class ConversationTurn:
             'narration': self.narration,
             'npc_speeches': self.npc_speeches,
             'effects_summary': self.effects_summary,
-            'timestamp': self.timestamp
+            'timestamp': self.timestamp,
+            'items_gained': self.items_gained
         }
 
     @classmethod
     def from_dict(cls, data):
-        return cls(**data)
+        return cls(
+            turn_number=data.get('turn_number', 0),
+            player_action=data.get('player_action', ''),
+            narration=data.get('narration', ''),
+            npc_speeches=intern_speeches(data.get('npc_speeches') or []),
+            effects_summary=data.get('effects_summary') or [],
+            timestamp=data.get('timestamp', ''),
+            items_gained=data.get('items_gained'),
+        )
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class GameState:
     """Core game state containing all world and player data."""
     player: Player
     current_location_id: str
-    game_time: str  # ISO format datetime
+    game_time: InitVar[str]  # ISO format datetime; read and set through the game_time property
     turn: int = 0
     locations: Dict[str, Location] = field(default_factory=dict)
     active_quests: Dict[str, Quest] = field(default_factory=dict)
     npcs: Dict[str, dict] = field(default_factory=dict)  # NPC data
-    world_events_log: List[str] = field(default_factory=list)  # Recent events
-    conversation_history: List[dict] = field(default_factory=list)  # Full conversation turns
+    world_events_log: Deque = field(default_factory=lambda: deque(maxlen=WORLD_EVENTS_MAX))  # Recent events, see format_world_event
+    conversation_history: Deque[ConversationTurn] = field(default_factory=lambda: deque(maxlen=HISTORY_WINDOW_MAX))  # Recent full conversation turns
+    history_window_start: int = 0  # Index of the first conversation turn sent to the LLM
+    history_summary: str = ""  # Rolling summary of turns that have left the window
     last_narration: str = ""
     npc_relationships: Dict[str, float] = field(default_factory=dict)  # npc_id -> relationship (-1.0 to 1.0)
-    memory_store: Optional[MemoryStore] = None  # Phase 4: Long-term memory system
+    _memory_store: Optional[MemoryStore] = field(default=None, init=False, repr=False, compare=False)  # Phase 4: built lazily, see memory_store
+
+    # Game clock: minutes advanced since a parsed epoch, formatted only when game_time is read
+    _time_iso: Optional[str] = field(default=None, init=False, repr=False, compare=False)  # None while stale
+    _time_epoch: Optional[datetime] = field(default=None, init=False, repr=False, compare=False)  # Parsed on first use
+    _time_minutes: int = field(default=0, init=False, repr=False, compare=False)
+
+    # Bumped by mark_world_changed; caches over npcs/locations key on it via world_key
+    _world_version: int = field(default=0, init=False, repr=False, compare=False)
+    # Name/slug -> id lookups for ResponseValidator, rebuilt when _index_key changes
+    _index_key: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    _loc_name_index: Optional[Dict[str, str]] = field(default=None, init=False, repr=False, compare=False)
+    _loc_slug_index: Optional[Dict[str, str]] = field(default=None, init=False, repr=False, compare=False)
+    _npc_name_index: Optional[Dict[str, str]] = field(default=None, init=False, repr=False, compare=False)
+    _npc_slug_index: Optional[Dict[str, str]] = field(default=None, init=False, repr=False, compare=False)
+    # (history log path, last turn written to it) from the latest save/load
+    _history_saved: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    # (save path, digest of the bytes written there) from the latest save
+    _last_save: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
     
-    def __post_init__(self):
-        """Initialize memory store if not provided."""
-        if MEMORY_AVAILABLE and self.memory_store is None:
-            self.memory_store = MemoryStore()
+    def __post_init__(self, game_time: str):
+        """Set the clock and bound conversation history and event log."""
+        self._time_iso = game_time
+        if any(isinstance(turn, dict) for turn in self.conversation_history):
+            # Turns from older saves (or callers) as plain dicts
+            self.conversation_history = deque(
+                (ConversationTurn.from_dict(turn) if isinstance(turn, dict) else turn
+                 for turn in self.conversation_history),
+                maxlen=HISTORY_WINDOW_MAX,
+            )
+        if not isinstance(self.conversation_history, deque) or self.conversation_history.maxlen != HISTORY_WINDOW_MAX:
+            dropped = max(0, len(self.conversation_history) - HISTORY_WINDOW_MAX)
+            self.conversation_history = deque(self.conversation_history, maxlen=HISTORY_WINDOW_MAX)
+            self.history_window_start = max(0, self.history_window_start - dropped)
+        if not isinstance(self.world_events_log, deque) or self.world_events_log.maxlen != WORLD_EVENTS_MAX:
+            self.world_events_log = deque(self.world_events_log, maxlen=WORLD_EVENTS_MAX)
+
+    def _get_game_time(self) -> str:
+        if self._time_iso is None:
+            self._time_iso = (self._time_epoch + timedelta(minutes=self._time_minutes)).isoformat()
+        return self._time_iso
+
+    def _set_game_time(self, value: str):
+        self._time_iso = value
+        self._time_epoch = None
+
+    def current_time(self) -> datetime:
+        """Current game time as a datetime."""
+        if self._time_epoch is None:
+            self._time_epoch = datetime.fromisoformat(self._time_iso)
+            self._time_minutes = 0
+        return self._time_epoch + timedelta(minutes=self._time_minutes)
+
+    def advance_time(self, minutes: int):
+        """Move the clock forward; game_time is formatted again on its next read."""
+        if self._time_epoch is None:
+            self._time_epoch = datetime.fromisoformat(self._time_iso)
+            self._time_minutes = 0
+        self._time_minutes += minutes
+        self._time_iso = None
+
+    @property
+    def memory_store(self) -> Optional[MemoryStore]:
+        """Long-term memory store, created on first access (None without the memory package)."""
+        if self._memory_store is None and MEMORY_AVAILABLE:
+            self._memory_store = MemoryStore()
+        return self._memory_store
+
+    @memory_store.setter
+    def memory_store(self, store: Optional[MemoryStore]):
+        self._memory_store = store
+
+    def mark_world_changed(self):
+        """
+        Invalidate lookups built over npcs and locations.
+
+        Call after adding, removing or renaming an NPC or location, changing
+        an NPC's role, or changing a location's npcs list in place; replacing
+        the dicts or lists themselves is noticed without it.
+        """
+        self._world_version += 1
+
+    def world_key(self, *objects) -> tuple:
+        """Cache key over the world version and the given objects (compared by identity first)."""
+        return (self._world_version, *objects)
+
+    @property
+    def existing_memory_store(self) -> Optional[MemoryStore]:
+        """The memory store if one was created or loaded; never builds one."""
+        return self._memory_store
 
     def save_to_file(self, filepath: str):
         """Save game state to JSON file."""
@@ -162,28 +352,95 @@ class GameState:
             'locations': {k: v.to_dict() for k, v in self.locations.items()},
             'active_quests': {k: v.to_dict() for k, v in self.active_quests.items()},
             'npcs': self.npcs,
-            'world_events_log': self.world_events_log,
-            'conversation_history': self.conversation_history,
+            'world_events_log': [format_world_event(event) for event in self.world_events_log],
+            'history_window_start': self.history_window_start,
+            'history_summary': self.history_summary,
             'last_narration': self.last_narration,
             'npc_relationships': self.npc_relationships,
         }
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=2)
+        if ORJSON_AVAILABLE:
+            payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        else:
+            payload = json.dumps(data, indent=2).encode('utf-8')
+
+        # Skip rewriting an unchanged save (e.g. autosaves while the player is idle)
+        digest = hashlib.blake2b(payload, digest_size=16).digest()
+        if self._last_save != (filepath, digest) or not os.path.exists(filepath):
+            # Write a temp file and swap it in, so a crash mid-save keeps the old save
+            tmp_path = filepath + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, filepath)
+            self._last_save = (filepath, digest)
+
+        # Conversation history goes to an append-only log next to the save
+        self._save_history(filepath.replace('.json', '_history.jsonl'))
         
         # Save memories separately (Phase 4)
-        if MEMORY_AVAILABLE and self.memory_store:
-            memory_path = filepath.replace('.json', '_memories.json')
-            self.memory_store.save_to_json(memory_path)
+        # (columnar msgpack when msgspec is installed, JSON otherwise)
+        # (only a store that exists; saving never builds one)
+        if MEMORY_AVAILABLE and self._memory_store is not None:
+            if MSGSPEC_AVAILABLE:
+                self._memory_store.save_to_msgpack(filepath.replace('.json', '_memories.msgpack'))
+            else:
+                self._memory_store.save_to_json(filepath.replace('.json', '_memories.json'))
+
+    def _save_history(self, history_path: str):
+        """Append turns recorded since the last save; start a new log for a new save path.
+
+        Turns that left the window before they were saved are gone, so a
+        {"gap_after_turn": N} record marks where they would have been.
+        """
+        history = self.conversation_history
+        lines = []
+        if self._history_saved and self._history_saved[0] == history_path and os.path.exists(history_path):
+            mode, last_saved = 'a', self._history_saved[1]
+            new_turns = list(history)
+            if last_saved is not None:
+                for i, turn in enumerate(history):
+                    if turn is last_saved:
+                        new_turns = list(islice(history, i + 1, None))
+                        break
+                else:
+                    # The last saved turn left the window: keep what came after it
+                    new_turns = [t for t in history if t.turn_number > last_saved.turn_number]
+                    if new_turns and new_turns[0].turn_number > last_saved.turn_number + 1:
+                        lines.append(json.dumps({'gap_after_turn': last_saved.turn_number}))
+        else:
+            mode, new_turns = 'w', list(history)
+
+        lines.extend(json.dumps(turn.to_dict()) for turn in new_turns)
+        if lines or mode == 'w':
+            with open(history_path, mode, encoding='utf-8') as f:
+                f.writelines(line + '\n' for line in lines)
+        self._history_saved = (history_path, history[-1] if history else None)
 
     @classmethod
     def load_from_file(cls, filepath: str):
         """Load game state from JSON file."""
-        with open(filepath, 'r') as f:
-            data = json.load(f)
+        if ORJSON_AVAILABLE:
+            with open(filepath, 'rb') as f:
+                data = orjson.loads(f.read())
+        else:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
 
         player = Player.from_dict(data['player'])
         locations = {k: Location.from_dict(v) for k, v in data['locations'].items()}
         active_quests = {k: Quest.from_dict(v) for k, v in data['active_quests'].items()}
+        npcs = intern_npc_ids(data['npcs'], locations)
+
+        # Older saves embed the history; newer ones keep it in the JSONL log
+        history_path = filepath.replace('.json', '_history.jsonl')
+        from_log = 'conversation_history' not in data
+        if from_log:
+            history = deque(maxlen=HISTORY_WINDOW_MAX)
+            if os.path.exists(history_path):
+                with open(history_path, 'r', encoding='utf-8') as f:
+                    records = (json.loads(line) for line in f if line.strip())
+                    history.extend(ConversationTurn.from_dict(r) for r in records if 'gap_after_turn' not in r)
+        else:
+            history = data['conversation_history']
 
         state = cls(
             player=player,
@@ -192,18 +449,24 @@ class GameState:
             turn=data['turn'],
             locations=locations,
             active_quests=active_quests,
-            npcs=data['npcs'],
+            npcs=npcs,
             world_events_log=data['world_events_log'],
-            conversation_history=data.get('conversation_history', []),
+            conversation_history=history,
+            history_window_start=data.get('history_window_start', 0),
+            history_summary=data.get('history_summary', ''),
             last_narration=data['last_narration'],
             npc_relationships=data.get('npc_relationships', {}),
         )
+        if from_log:
+            state._history_saved = (history_path, history[-1] if history else None)
         
         # Load memories separately (Phase 4)
-        if MEMORY_AVAILABLE and state.memory_store:
-            memory_path = filepath.replace('.json', '_memories.json')
-            if os.path.exists(memory_path):
-                state.memory_store.load_from_json(memory_path)
+        msgpack_path = filepath.replace('.json', '_memories.msgpack')
+        memory_path = filepath.replace('.json', '_memories.json')
+        if MEMORY_AVAILABLE and MSGSPEC_AVAILABLE and os.path.exists(msgpack_path):
+            state.memory_store.load_from_msgpack(msgpack_path)
+        elif MEMORY_AVAILABLE and os.path.exists(memory_path):
+            state.memory_store.load_from_json(memory_path)
         
         return state
 
@@ -217,8 +480,15 @@ class GameState:
             'locations': {k: v.to_dict() for k, v in self.locations.items()},
             'active_quests': {k: v.to_dict() for k, v in self.active_quests.items()},
             'npcs': self.npcs,
-            'world_events_log': self.world_events_log,
-            'conversation_history': self.conversation_history,
+            'world_events_log': [format_world_event(event) for event in self.world_events_log],
+            'conversation_history': [turn.to_dict() for turn in self.conversation_history],
+            'history_window_start': self.history_window_start,
+            'history_summary': self.history_summary,
             'last_narration': self.last_narration,
             'npc_relationships': self.npc_relationships,
         }
+
+
+# Set after the class: in the class body it would become the game_time InitVar's default
+GameState.game_time = property(GameState._get_game_time, GameState._set_game_time,
+                               doc="Current game time as an ISO format string.")
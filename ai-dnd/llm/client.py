@@ -2,17 +2,103 @@
 
 import requests
 import json
-from typing import Optional
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Callable, Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from engine.response_parser import _scan_json_object
+from engine.response_schema import now_iso
+
+# Exact-match response cache: only near-deterministic calls are replayed. The key
+# covers the whole prompt, Turn/Time lines included, so it only dedupes identical
+# requests within one turn (a retried or re-sent action); it never hits across turns
+RESPONSE_CACHE_MAX_TEMPERATURE = 0.1
+RESPONSE_CACHE_SIZE = 256
+
+# How long an is_available() probe result is reused, in seconds
+AVAILABILITY_TTL = 2.0
+
+# How long Ollama keeps the model loaded after a request (Ollama's default is 5m,
+# short enough to unload it while the player reads a turn)
+KEEP_ALIVE = "30m"
+
+# Optional fast JSON for request bodies, streamed chunks and reply validation
+try:
+    import orjson
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj, sort_keys: bool = False) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj, sort_keys: bool = False) -> bytes:
+        return json.dumps(obj, sort_keys=sort_keys).encode("utf-8")
+
+# Bodies are pre-encoded with _json_dumps, so the content type is set by hand
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Optional async HTTP for the a* methods
+try:
+    import asyncio
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
 
 
 class OllamaClient:
     """Client for communicating with Ollama local LLM."""
 
-    def __init__(self, base_url: str = "http://localhost:11434", model: str = "llama2"):
+    def __init__(self, base_url: str = "http://localhost:11434", model: str = "llama2",
+                 cache_enabled: bool = True):
         self.base_url = base_url
         self.model = model
         self.api_endpoint = f"{self.base_url}/api/generate"
+        self.chat_endpoint = f"{self.base_url}/api/chat"
+
+        # Pooled keep-alive sessions, one per calling thread (requests.Session
+        # isn't thread-safe; see _session); retries are handled per JSON attempt
+        self._local = threading.local()
+        self._sessions: List[requests.Session] = []
+        self._sessions_lock = threading.Lock()
+        self._async_session = None  # aiohttp session, created by the first async call
+
+        self.cache_enabled = cache_enabled
+        self._response_cache: "OrderedDict[str, str]" = OrderedDict()  # LRU: key -> validated response
+        self._available: Optional[tuple] = None  # (monotonic probe time, result)
+
+    @property
+    def _session(self) -> requests.Session:
+        """This thread's pooled session, created on its first call."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=Retry(total=0))
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def close(self):
+        """Close pooled connections to Ollama (every thread's)."""
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        self._local = threading.local()
+        for session in sessions:
+            session.close()
+
+    async def aclose(self):
+        """Close the async session, if one was opened."""
+        if self._async_session is not None:
+            await self._async_session.close()
+            self._async_session = None
 
     def generate(
         self,
@@ -21,6 +107,8 @@ class OllamaClient:
         top_p: float = 0.9,
         max_tokens: int = 1024,
         system: Optional[str] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        json_mode: bool = False,
     ) -> str:
         """
         Generate text from the LLM.
@@ -31,35 +119,272 @@ class OllamaClient:
             top_p: Nucleus sampling parameter
             max_tokens: Max length of response
             system: System prompt to set context
+            on_token: Called with each text chunk as it streams in
+            json_mode: Constrain decoding to valid JSON (Ollama's format="json")
+
+        Returns:
+            Generated text response
+        """
+        payload = self._generate_payload(prompt, temperature, top_p, max_tokens, system, json_mode)
+
+        try:
+            return self._stream(self.api_endpoint, payload, self._generate_text, on_token)
+        except requests.exceptions.ConnectionError:
+            return "[ERROR] Cannot connect to Ollama. Is it running on {}?".format(
+                self.base_url
+            )
+        except Exception as e:
+            return f"[ERROR] LLM generation failed: {str(e)}"
+
+    def chat(
+        self,
+        messages: List[dict],
+        temperature: float = 0.8,
+        top_p: float = 0.9,
+        max_tokens: int = 1024,
+        on_token: Optional[Callable[[str], None]] = None,
+        json_mode: bool = False,
+    ) -> str:
+        """
+        Generate text from a chat message list.
+
+        Messages may use provider-style content blocks (as built by
+        DMPromptBuilder.construct_messages); Ollama takes plain strings, so
+        blocks are flattened and cache_control markers are dropped.
+
+        Args:
+            messages: List of {"role", "content"} messages
+            temperature: Controls randomness (0.0-1.0)
+            top_p: Nucleus sampling parameter
+            max_tokens: Max length of response
+            on_token: Called with each text chunk as it streams in
+            json_mode: Constrain decoding to valid JSON (Ollama's format="json")
 
         Returns:
             Generated text response
         """
-        full_prompt = prompt
+        payload = self._chat_payload(messages, temperature, top_p, max_tokens, json_mode)
+
+        try:
+            return self._stream(self.chat_endpoint, payload, self._chat_text, on_token)
+        except requests.exceptions.ConnectionError:
+            return "[ERROR] Cannot connect to Ollama. Is it running on {}?".format(
+                self.base_url
+            )
+        except Exception as e:
+            return f"[ERROR] LLM generation failed: {str(e)}"
+
+    def _stream(self, endpoint: str, payload: dict, extract, on_token=None) -> str:
+        """
+        POST a streaming request and join the text chunks as they arrive.
+
+        Ollama streams one JSON object per line; extract(chunk) pulls the
+        text out of each one.
+        """
+        parts = []
+        with self._session.post(endpoint, data=_json_dumps(payload), headers=_JSON_HEADERS,
+                                stream=True, timeout=(5, 300)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if self._handle_chunk(line, extract, parts, on_token):
+                    break
+        return "".join(parts).strip()
+
+    @staticmethod
+    def _handle_chunk(line: bytes, extract, parts: List[str], on_token=None) -> bool:
+        """Append one streamed line's text to parts; returns True once the stream is done."""
+        line = line.strip()
+        if not line:
+            return False
+        chunk = _json_loads(line)
+        if "error" in chunk:
+            raise RuntimeError(chunk["error"])
+        text = extract(chunk)
+        if text:
+            parts.append(text)
+            if on_token:
+                try:
+                    on_token(text)
+                except Exception:
+                    pass  # display only; a failing callback must not cost the reply
+        return bool(chunk.get("done"))
+
+    def _generate_payload(self, prompt: str, temperature: float, top_p: float,
+                          max_tokens: int, system: Optional[str], json_mode: bool = False) -> dict:
+        """
+        Request body for /api/generate.
+
+        The system prompt goes in Ollama's own "system" field rather than
+        being prefixed to the prompt, so the unchanged system text stays a
+        reusable KV-cache prefix across turns.
+        """
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": KEEP_ALIVE,
+            "options": {
+                "temperature": temperature,
+                "top_p": top_p,
+                "num_predict": max_tokens,
+            },
+        }
         if system:
-            full_prompt = f"{system}\n\n{prompt}"
+            payload["system"] = system
+            # Keep the system tokens when the context window shifts (~4 chars per token)
+            payload["options"]["num_keep"] = len(system) // 4
+        if json_mode:
+            payload["format"] = "json"
+        return payload
 
+    def _chat_payload(self, messages: List[dict], temperature: float, top_p: float,
+                      max_tokens: int, json_mode: bool = False) -> dict:
+        """Request body for /api/chat."""
         payload = {
             "model": self.model,
-            "prompt": full_prompt,
-            "stream": False,
-            "temperature": temperature,
-            "top_p": top_p,
-            "num_predict": max_tokens,
+            "messages": [
+                {"role": message["role"], "content": self._flatten_content(message["content"])}
+                for message in messages
+            ],
+            "stream": True,
+            "keep_alive": KEEP_ALIVE,
+            "options": {
+                "temperature": temperature,
+                "top_p": top_p,
+                "num_predict": max_tokens,
+            },
         }
+        if payload["messages"] and payload["messages"][0]["role"] == "system":
+            # As in _generate_payload: keep the system tokens when the context shifts
+            payload["options"]["num_keep"] = len(payload["messages"][0]["content"]) // 4
+        if json_mode:
+            payload["format"] = "json"
+        return payload
 
-        try:
-            response = requests.post(self.api_endpoint, json=payload, timeout=60)
+    @staticmethod
+    def _generate_text(chunk: dict) -> Optional[str]:
+        return chunk.get("response")
+
+    @staticmethod
+    def _chat_text(chunk: dict) -> Optional[str]:
+        return chunk.get("message", {}).get("content")
+
+    async def _get_async_session(self):
+        """Shared aiohttp session with a keep-alive connection pool."""
+        if self._async_session is None or self._async_session.closed:
+            self._async_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=10, keepalive_timeout=90),
+                timeout=aiohttp.ClientTimeout(total=None, connect=5, sock_read=300),
+            )
+        return self._async_session
+
+    async def _astream(self, endpoint: str, payload: dict, extract, on_token=None) -> str:
+        """Async twin of _stream."""
+        session = await self._get_async_session()
+        parts = []
+        async with session.post(endpoint, data=_json_dumps(payload), headers=_JSON_HEADERS) as response:
             response.raise_for_status()
-            data = response.json()
-            return data.get("response", "").strip()
-        except requests.exceptions.ConnectionError:
+            async for line in response.content:
+                if self._handle_chunk(line, extract, parts, on_token):
+                    break
+        return "".join(parts).strip()
+
+    async def _arequest(self, endpoint: str, payload: dict, extract, on_token=None) -> str:
+        """Run _astream, mapping failures to the same [ERROR] strings as the sync calls."""
+        if not AIOHTTP_AVAILABLE:
+            return "[ERROR] Async LLM calls require aiohttp (pip install aiohttp)"
+        try:
+            return await self._astream(endpoint, payload, extract, on_token)
+        except aiohttp.ClientConnectionError:
             return "[ERROR] Cannot connect to Ollama. Is it running on {}?".format(
                 self.base_url
             )
         except Exception as e:
             return f"[ERROR] LLM generation failed: {str(e)}"
 
+    async def agenerate(
+        self,
+        prompt: str,
+        temperature: float = 0.8,
+        top_p: float = 0.9,
+        max_tokens: int = 1024,
+        system: Optional[str] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        json_mode: bool = False,
+    ) -> str:
+        """Async version of generate; concurrent calls share one connection pool."""
+        payload = self._generate_payload(prompt, temperature, top_p, max_tokens, system, json_mode)
+        return await self._arequest(self.api_endpoint, payload, self._generate_text, on_token)
+
+    async def achat(
+        self,
+        messages: List[dict],
+        temperature: float = 0.8,
+        top_p: float = 0.9,
+        max_tokens: int = 1024,
+        on_token: Optional[Callable[[str], None]] = None,
+        json_mode: bool = False,
+    ) -> str:
+        """Async version of chat."""
+        payload = self._chat_payload(messages, temperature, top_p, max_tokens, json_mode)
+        return await self._arequest(self.chat_endpoint, payload, self._chat_text, on_token)
+
+    async def agenerate_npc_dialog(
+        self,
+        npc_id: str,
+        system_prompt: str,
+        prompt: str,
+        temperature: float = 0.8,
+    ) -> Optional[dict]:
+        """
+        Generate one NPC's line of dialog (see DMPromptBuilder.npc_only_prompt).
+
+        Returns:
+            {"npc_id", "text", "emotion"} speech dict, or None if the call
+            failed or the reply had no usable text
+        """
+        response = await self.agenerate(
+            prompt,
+            temperature=temperature,
+            max_tokens=256,
+            system=system_prompt,
+            json_mode=True,
+        )
+        if response.startswith("[ERROR]"):
+            return None
+        json_str = _scan_json_object(response)
+        try:
+            data = _json_loads(json_str) if json_str else None
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(data, dict) or not data.get("text"):
+            return None
+        return {"npc_id": npc_id, "text": str(data["text"]), "emotion": str(data.get("emotion") or "neutral")}
+
+    async def agenerate_npc_speeches(self, prompts: Dict[str, tuple], temperature: float = 0.8) -> List[dict]:
+        """
+        Generate several NPCs' dialog concurrently.
+
+        Args:
+            prompts: npc_id -> (system_prompt, prompt) from DMPromptBuilder.npc_only_prompt
+            temperature: Sampling temperature
+
+        Returns:
+            Speech dicts for the NPCs whose call succeeded, in prompts order
+        """
+        results = await asyncio.gather(*(
+            self.agenerate_npc_dialog(npc_id, system_prompt, prompt, temperature)
+            for npc_id, (system_prompt, prompt) in prompts.items()
+        ))
+        return [speech for speech in results if speech]
+
+    @staticmethod
+    def _flatten_content(content) -> str:
+        """Join text content blocks into a single string."""
+        if isinstance(content, str):
+            return content
+        return "\n\n".join(block.get("text", "") for block in content)
+
     def generate_dm_response_with_retry(
         self,
         system_prompt: str,
@@ -67,9 +392,13 @@ class OllamaClient:
         player_input: str,
         temperature: float = 0.8,
         max_retries: int = 2,
+        on_token: Optional[Callable[[str], None]] = None,
     ) -> str:
         """
         Generate a DM response with retry logic for malformed JSON.
+
+        Decoding runs in Ollama's JSON mode, so retries are only a fallback
+        for replies that are cut off or otherwise still unparseable.
         
         Args:
             system_prompt: System prompt defining DM behavior
@@ -77,51 +406,262 @@ class OllamaClient:
             player_input: What the player said/did
             temperature: Sampling temperature
             max_retries: Number of retry attempts on JSON failure
+            on_token: Called with each text chunk as it streams in (not
+                called for cached responses)
             
         Returns:
             DM's response (ideally valid JSON)
         """
         user_prompt = f"{game_context}\n\nPlayer action: {player_input}\n\nDM response (JSON):"
         
-        for attempt in range(max_retries + 1):
-            response = self.generate(
+        return self._generate_json_with_retry(
+            lambda temp: self.generate(
                 prompt=user_prompt,
                 system=system_prompt,
-                temperature=temperature,
+                temperature=temp,
                 max_tokens=1024,
-            )
+                on_token=on_token,
+                json_mode=True,
+            ),
+            player_input,
+            temperature,
+            max_retries,
+            self._cache_key(temperature, system_prompt, game_context, player_input),
+        )
+
+    def chat_dm_response_with_retry(
+        self,
+        messages: List[dict],
+        player_input: str,
+        temperature: float = 0.8,
+        max_retries: int = 2,
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        """
+        Generate a DM response from chat messages with retry logic for malformed JSON.
+        
+        Args:
+            messages: Message list from DMPromptBuilder.construct_messages
+            player_input: What the player said/did (used for the fallback)
+            temperature: Sampling temperature
+            max_retries: Number of retry attempts on JSON failure
+            on_token: Called with each text chunk as it streams in (not
+                called for cached responses)
             
-            # Check if it looks like an error
-            if response.startswith("[ERROR]"):
+        Returns:
+            DM's response (ideally valid JSON)
+        """
+        return self._generate_json_with_retry(
+            lambda temp: self.chat(messages, temperature=temp, max_tokens=1024, on_token=on_token, json_mode=True),
+            player_input,
+            temperature,
+            max_retries,
+            self._cache_key(temperature, messages),
+        )
+
+    async def agenerate_dm_response_with_retry(
+        self,
+        system_prompt: str,
+        game_context: str,
+        player_input: str,
+        temperature: float = 0.8,
+        max_retries: int = 2,
+        parallel_retries: bool = False,
+    ) -> str:
+        """
+        Async version of generate_dm_response_with_retry.
+
+        parallel_retries sends every attempt at once and keeps the first valid
+        reply; only worth it on a backend that serves requests in parallel.
+        """
+        user_prompt = f"{game_context}\n\nPlayer action: {player_input}\n\nDM response (JSON):"
+
+        return await self._agenerate_json_with_retry(
+            lambda temp: self.agenerate(
+                prompt=user_prompt,
+                system=system_prompt,
+                temperature=temp,
+                max_tokens=1024,
+                json_mode=True,
+            ),
+            player_input,
+            temperature,
+            max_retries,
+            self._cache_key(temperature, system_prompt, game_context, player_input),
+            parallel_retries,
+        )
+
+    async def achat_dm_response_with_retry(
+        self,
+        messages: List[dict],
+        player_input: str,
+        temperature: float = 0.8,
+        max_retries: int = 2,
+        parallel_retries: bool = False,
+    ) -> str:
+        """Async version of chat_dm_response_with_retry (see agenerate_dm_response_with_retry for parallel_retries)."""
+        return await self._agenerate_json_with_retry(
+            lambda temp: self.achat(messages, temperature=temp, max_tokens=1024, json_mode=True),
+            player_input,
+            temperature,
+            max_retries,
+            self._cache_key(temperature, messages),
+            parallel_retries=parallel_retries,
+        )
+
+    def _cacheable(self, temperature: float) -> bool:
+        return self.cache_enabled and temperature <= RESPONSE_CACHE_MAX_TEMPERATURE
+
+    def _cache_key(self, temperature: float, *parts) -> Optional[str]:
+        """
+        Response cache key for a call, or None when the call shouldn't be cached.
+
+        Parts are strings, bytes or (like chat messages) JSON-serializable
+        values; the latter are only serialized once the call is cacheable.
+        """
+        if not self._cacheable(temperature):
+            return None
+        digest = blake2b(digest_size=16)
+        for part in (self.model, f"{temperature}", *parts):
+            if not isinstance(part, (str, bytes)):
+                part = _json_dumps(part, sort_keys=True)
+            digest.update(part if isinstance(part, bytes) else part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _cache_get(self, key: Optional[str]) -> Optional[str]:
+        if key is None or key not in self._response_cache:
+            return None
+        self._response_cache.move_to_end(key)
+        return self._response_cache[key]
+
+    def _cache_put(self, key: Optional[str], response: str):
+        if key is None:
+            return
+        self._response_cache[key] = response
+        self._response_cache.move_to_end(key)
+        if len(self._response_cache) > RESPONSE_CACHE_SIZE:
+            self._response_cache.popitem(last=False)
+
+    def _generate_json_with_retry(self, call, player_input: str, temperature: float, max_retries: int,
+                                  cache_key: Optional[str] = None) -> str:
+        """Run call(temperature) until it returns parseable JSON, lowering temperature on retries."""
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+        for attempt in range(max_retries + 1):
+            response = call(temperature)
+            status, temperature = self._check_attempt(response, attempt, max_retries, temperature)
+            if status == "ok":
+                self._cache_put(cache_key, response)
+                return response
+            if status == "fallback":
                 return self._fallback_response(player_input)
-            
-            # Try to validate JSON
-            try:
-                import re
-                json_match = re.search(r'\{.*\}', response, re.DOTALL)
-                if json_match:
-                    json.loads(json_match.group(0))  # Validate JSON
-                    return response  # Success!
-            except json.JSONDecodeError:
-                if attempt < max_retries:
-                    # Retry with lower temperature for more deterministic output
-                    temperature *= 0.7
-                    print(f"[Retry {attempt + 1}/{max_retries}: Invalid JSON, retrying with temp={temperature:.2f}]")
-                    continue
-                else:
-                    # Final attempt failed, return fallback
-                    print(f"[All retries exhausted, using fallback response]")
-                    return self._fallback_response(player_input)
         
         return self._fallback_response(player_input)
 
+    async def _agenerate_json_with_retry(self, call, player_input: str, temperature: float, max_retries: int,
+                                         cache_key: Optional[str] = None, parallel_retries: bool = False) -> str:
+        """
+        Async version of _generate_json_with_retry; call(temperature) returns an awaitable.
+
+        With parallel_retries, every attempt is sent at once (see
+        _afirst_valid_json) instead of one after another.
+        """
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+        response = None
+        if parallel_retries:
+            response = await self._afirst_valid_json(call, temperature, max_retries)
+            if response is None:
+                print(f"[All {max_retries + 1} parallel attempts failed, using fallback response]")
+        else:
+            for attempt in range(max_retries + 1):
+                reply = await call(temperature)
+                status, temperature = self._check_attempt(reply, attempt, max_retries, temperature)
+                if status == "ok":
+                    response = reply
+                    break
+                if status == "fallback":
+                    break
+                await asyncio.sleep(0)  # Let other pending calls run between attempts
+
+        if response is None:
+            return self._fallback_response(player_input)
+        self._cache_put(cache_key, response)
+        return response
+
+    async def _afirst_valid_json(self, call, temperature: float, max_retries: int) -> Optional[str]:
+        """
+        Run all max_retries + 1 attempts concurrently, at the temperatures the
+        sequential loop would use (T, 0.7T, 0.49T, ...), and return the first
+        reply holding valid JSON; the rest are cancelled. None if none do.
+        """
+        tasks = [asyncio.ensure_future(call(temperature * 0.7 ** attempt)) for attempt in range(max_retries + 1)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                response = await next_done
+                if self._is_valid_json(response):
+                    return response
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def _is_valid_json(response: str) -> bool:
+        """True if response is not an error and contains a parseable JSON object."""
+        if response.startswith("[ERROR]"):
+            return False
+        json_str = _scan_json_object(response)
+        if not json_str:
+            return False
+        try:
+            _json_loads(json_str)
+        except json.JSONDecodeError:
+            return False
+        return True
+
+    @staticmethod
+    def _check_attempt(response: str, attempt: int, max_retries: int, temperature: float):
+        """
+        Judge one retry attempt.
+
+        Returns (status, temperature): status is "ok" for valid JSON,
+        "fallback" to give up, or "retry" to try again at the returned
+        temperature.
+        """
+        # Check if it looks like an error
+        if response.startswith("[ERROR]"):
+            return "fallback", temperature
+        
+        # Try to validate JSON
+        try:
+            json_str = _scan_json_object(response)
+            if json_str:
+                _json_loads(json_str)  # Validate JSON
+                return "ok", temperature  # Success!
+        except json.JSONDecodeError:
+            if attempt < max_retries:
+                # Retry with lower temperature for more deterministic output
+                temperature *= 0.7
+                print(f"[Retry {attempt + 1}/{max_retries}: Invalid JSON, retrying with temp={temperature:.2f}]")
+            else:
+                # Final attempt failed, return fallback
+                print(f"[All retries exhausted, using fallback response]")
+                return "fallback", temperature
+        return "retry", temperature
+
     def _fallback_response(self, player_action: str) -> str:
         """
         Generate a fallback response when LLM fails or returns invalid JSON.
         
         Returns valid JSON that won't crash the parser.
         """
-        return json.dumps({
+        return _json_dumps({
             "narration": f"You attempt to {player_action}. The world shimmers mysteriously as reality adjusts. Perhaps you should try a different approach.",
             "npc_speeches": [],
             "effects": {
@@ -139,8 +679,8 @@ class OllamaClient:
                 "Try something else",
                 "Wait and observe"
             ],
-            "timestamp": datetime.now().isoformat()
-        })
+            "timestamp": now_iso()
+        }).decode("utf-8")
 
     def generate_dm_response(
         self,
@@ -168,10 +708,50 @@ class OllamaClient:
             system_prompt, game_context, player_input, temperature, max_retries=0
         )
 
+    def _cached_availability(self) -> Optional[bool]:
+        """Last probe result if it is younger than AVAILABILITY_TTL, else None."""
+        if self._available is not None and time.monotonic() - self._available[0] < AVAILABILITY_TTL:
+            return self._available[1]
+        return None
+
+    def _remember_availability(self, available: bool) -> bool:
+        self._available = (time.monotonic(), available)
+        return available
+
     def is_available(self) -> bool:
-        """Check if Ollama is available and responsive."""
+        """Check if Ollama is available and responsive (cached for AVAILABILITY_TTL)."""
+        cached = self._cached_availability()
+        if cached is not None:
+            return cached
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
-            return response.status_code == 200
+            response = self._session.get(f"{self.base_url}/api/tags", timeout=5)
+            available = response.status_code == 200
         except:
+            available = False
+        return self._remember_availability(available)
+
+    def warm_up(self) -> bool:
+        """Load the model into memory ahead of the first turn (a prompt-less generate call)."""
+        payload = {"model": self.model, "prompt": "", "stream": False, "keep_alive": KEEP_ALIVE}
+        try:
+            response = self._session.post(self.api_endpoint, data=_json_dumps(payload),
+                                          headers=_JSON_HEADERS, timeout=(5, 300))
+            return response.status_code == 200
+        except requests.exceptions.RequestException:
             return False
+
+    async def ais_available(self) -> bool:
+        """Async version of is_available."""
+        cached = self._cached_availability()
+        if cached is not None:
+            return cached
+        if not AIOHTTP_AVAILABLE:
+            return False
+        try:
+            session = await self._get_async_session()
+            async with session.get(f"{self.base_url}/api/tags",
+                                   timeout=aiohttp.ClientTimeout(total=5)) as response:
+                available = response.status == 200
+        except Exception:
+            available = False
+        return self._remember_availability(available)
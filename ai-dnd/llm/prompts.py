@@ -1,7 +1,11 @@
 """Prompt templates and builders for DM responses."""
 
-from engine.state import GameState
-from typing import Optional
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from itertools import islice
+from engine.game_loop import RELATIONSHIP_STATUSES, RELATIONSHIP_THRESHOLDS
+from engine.state import ConversationTurn, GameState, format_world_event
+from typing import Dict, List, Optional
 
 # Check if memory system is available (Phase 4)
 try:
@@ -11,16 +15,22 @@ try:
 except ImportError:
     MEMORY_AVAILABLE = False
 
+# Mood score -> label: each threshold is the exclusive lower bound of the next
+# label (mood > 0.3 is "happy"), hence bisect_left.
+MOOD_THRESHOLDS = (-0.3, 0.3)
+MOOD_STATUSES = ("upset", "neutral", "happy")
 
-class DMPromptBuilder:
-    """Builder for constructing DM system and context prompts."""
+# Memory emotion -> icon in memory listings (prompt memory context and the CLI)
+MEMORY_EMOTION_ICONS = {
+    "gratitude": "🙏",
+    "fear": "😨",
+    "anger": "😠",
+    "joy": "😊",
+    "sadness": "😢",
+    "neutral": "😐",
+}
 
-    @staticmethod
-    def json_output_format() -> str:
-        """
-        JSON format specification for structured DM responses.
-        """
-        return """
+_JSON_FORMAT = """
 You MUST respond in this exact JSON format:
 
 {
@@ -62,12 +72,7 @@ CRITICAL RULES:
 - suggested_options should be 2-4 natural next actions
 """
 
-    @staticmethod
-    def system_prompt() -> str:
-        """
-        Core system prompt that defines DM behavior.
-        """
-        return """You are an expert Dungeon Master (DM) for a fantasy tabletop RPG adventure.
+_SYSTEM_PROMPT = """You are an expert Dungeon Master (DM) for a fantasy tabletop RPG adventure.
 
 Your responsibilities:
 - Narrate the world vividly but concisely
@@ -126,6 +131,90 @@ MEMORY & CONTINUITY (Phase 4):
 - Higher importance memories are more likely to be referenced
 - Let past actions influence current NPC attitudes and responses"""
 
+# Built once; construct_full_prompt / construct_messages send it every turn
+_SYSTEM_PLUS_JSON = _SYSTEM_PROMPT + "\n\n" + _JSON_FORMAT
+_SYSTEM_PLUS_JSON_STRIPPED = _SYSTEM_PLUS_JSON.strip()
+
+_SUMMARY_SYSTEM_PROMPT = """You keep the running story summary for a fantasy tabletop RPG.
+
+Merge the previous summary with the new turns and summarize them in 3 sentences.
+Keep names, places, promises, purchases and unresolved threads; drop flavor text.
+Reply with the summary only, no headings or JSON."""
+
+_NPC_DIALOG_FORMAT = """Reply in this exact JSON format, with only the words you say aloud:
+
+{"text": "What brings you here, friend?", "emotion": "friendly"}"""
+
+
+def _npc_block_key(npc: dict) -> tuple:
+    """Hashable snapshot of the static NPC fields rendered by _render_npc_block."""
+    traits = npc.get('personality_traits')
+    if traits is not None:
+        traits = (
+            traits.get('archetype', 'unknown'),
+            traits.get('temperament', 'unknown'),
+            traits.get('speech_style', 'normal'),
+            tuple(traits.get('values', [])),
+            tuple(traits.get('fears', [])),
+            tuple(traits.get('quirks') or ()),
+        )
+    return (
+        npc.get('name'),
+        npc.get('role', 'unknown'),
+        npc.get('personality', 'unknown'),
+        traits,
+    )
+
+
+@lru_cache(maxsize=256)
+def _render_npc_block(npc_id: str, key: tuple) -> str:
+    """Render the static description of an NPC (bio and traits); cached until they change.
+
+    Goal, mood and relationship can change during play and are rendered by
+    DMPromptBuilder._npc_attitude, outside the cached prompt prefix.
+    """
+    name, role, personality, traits = key
+    npc_detail = f"\n{name or npc_id} ({npc_id}):\n"
+    npc_detail += f"  Role: {role}\n"
+    npc_detail += f"  Personality: {personality}\n"
+    
+    # Add personality traits if available
+    if traits is not None:
+        archetype, temperament, speech_style, values, fears, quirks = traits
+        npc_detail += f"  Archetype: {archetype}\n"
+        npc_detail += f"  Temperament: {temperament}\n"
+        npc_detail += f"  Speech Style: {speech_style}\n"
+        npc_detail += f"  Values: {', '.join(values)}\n"
+        npc_detail += f"  Fears: {', '.join(fears)}\n"
+        if quirks:
+            npc_detail += f"  Quirks: {', '.join(quirks)}\n"
+    
+    return npc_detail
+
+
+def _mark(block: dict) -> dict:
+    """Attach an ephemeral cache_control breakpoint to a message content block."""
+    block["cache_control"] = {"type": "ephemeral"}
+    return block
+
+
+class DMPromptBuilder:
+    """Builder for constructing DM system and context prompts."""
+
+    @staticmethod
+    def json_output_format() -> str:
+        """
+        JSON format specification for structured DM responses.
+        """
+        return _JSON_FORMAT
+
+    @staticmethod
+    def system_prompt() -> str:
+        """
+        Core system prompt that defines DM behavior.
+        """
+        return _SYSTEM_PROMPT
+
     @staticmethod
     def build_memory_context(state: GameState, player_input: str, max_memories: int = 5) -> str:
         """Build memory context for NPCs present in current location.
@@ -138,14 +227,16 @@ MEMORY & CONTINUITY (Phase 4):
         Returns:
             Formatted string with relevant memories
         """
-        if not MEMORY_AVAILABLE or not state.memory_store:
+        store = state.existing_memory_store
+        if not MEMORY_AVAILABLE or store is None:
             return ""
         
         location = state.locations.get(state.current_location_id)
         if not location or not location.npcs:
             return ""
         
-        memory_context = "\n=== RELEVANT MEMORIES ==="
+        parts = []
+        game_time = state.current_time()
         
         for npc_id in location.npcs:
             if npc_id not in state.npcs:
@@ -154,14 +245,15 @@ MEMORY & CONTINUITY (Phase 4):
             npc_name = state.npcs[npc_id].get('name', npc_id)
             
             # Retrieve relevant memories for this NPC
-            memories = state.memory_store.retrieve_memories(
+            memories = store.retrieve_memories(
                 query=player_input,
                 npc_id=npc_id,
-                n=max_memories
+                n=max_memories,
+                current_time=game_time
             )
             
             # Also get high-importance memories
-            important_memories = state.memory_store.get_important_memories(
+            important_memories = store.get_important_memories(
                 npc_id=npc_id,
                 min_importance=0.7,
                 n=3
@@ -172,107 +264,212 @@ MEMORY & CONTINUITY (Phase 4):
             all_memories = all_memories[:max_memories]
             
             if all_memories:
-                memory_context += f"\n\n{npc_name}'s Memories:"
+                parts.append(f"\n\n{npc_name}'s Memories:")
                 for memory in all_memories:
                     if isinstance(memory, EpisodicMemory):
-                        emotion_icon = {
-                            "gratitude": "🙏",
-                            "fear": "😨",
-                            "anger": "😠",
-                            "joy": "😊",
-                            "sadness": "😢",
-                            "neutral": "😐"
-                        }.get(memory.emotion, "")
-                        
+                        emotion_icon = MEMORY_EMOTION_ICONS.get(memory.emotion, "")
                         strength_pct = int(memory.current_strength * 100)
                         importance_stars = "⭐" * int(memory.importance * 3)
                         
-                        memory_context += f"\n  {emotion_icon} [Episodic {importance_stars} {strength_pct}%] {memory.text}"
+                        parts.append(f"\n  {emotion_icon} [Episodic {importance_stars} {strength_pct}%] {memory.text}")
                         if memory.location:
-                            memory_context += f" (at {memory.location})"
+                            parts.append(f" (at {memory.location})")
                     
                     elif isinstance(memory, SemanticMemory):
                         confidence_pct = int(memory.confidence * 100)
-                        memory_context += f"\n  📝 [Fact: {memory.fact_type}, {confidence_pct}% sure] {memory.text}"
+                        parts.append(f"\n  📝 [Fact: {memory.fact_type}, {confidence_pct}% sure] {memory.text}")
         
-        return memory_context if "Memories:" in memory_context else ""
+        if not parts:
+            return ""
+        return "\n=== RELEVANT MEMORIES ===" + "".join(parts)
 
     @staticmethod
-    def game_context(state: GameState, max_history_turns: int = 5) -> str:
-        """
-        Build a context prompt from game state.
+    def _history_window(state: GameState, max_history_turns: Optional[int] = None) -> List[ConversationTurn]:
+        """Conversation turns to send: the append-only window, or the last N turns."""
+        history = state.conversation_history
+        if max_history_turns is None:
+            start = state.history_window_start
+        else:
+            start = max(0, len(history) - max_history_turns)
+        return list(islice(history, start, None))
+
+    @staticmethod
+    def _format_history_turn(state: GameState, turn_data: ConversationTurn) -> str:
+        """Render one stored conversation turn as context text."""
+        return (
+            f"\nTurn {turn_data.turn_number}:\n"
+            f"  Player: {turn_data.player_action}\n"
+            + DMPromptBuilder._format_dm_turn(state, turn_data, indent="  ")
+        )
+
+    @staticmethod
+    def _format_dm_turn(state: GameState, turn_data: ConversationTurn, indent: str = "") -> str:
+        """Render the DM side of a stored turn (narration, speeches, effects)."""
+        parts = [f"{indent}Narration: {turn_data.narration}\n"]
         
-        Args:
-            state: Current game state
-            max_history_turns: Maximum number of recent conversation turns to include
+        # Add NPC speeches if any
+        if turn_data.npc_speeches:
+            for speech in turn_data.npc_speeches:
+                npc_name = state.npcs.get(speech.get('npc_id', ''), {}).get('name', speech.get('npc_id', 'Unknown'))
+                emotion = speech.get('emotion', 'neutral')
+                speech_text = speech.get('text', '')
+                parts.append(f"{indent}{npc_name} ({emotion}): \"{speech_text}\"\n")
+        
+        # Add effects summary if any
+        if turn_data.effects_summary:
+            parts.append(f"{indent}Effects: {', '.join(turn_data.effects_summary)}\n")
+        return "".join(parts)
+
+    @staticmethod
+    def world_context(state: GameState) -> str:
+        """
+        Static part of the context: NPC definitions, location, quests.
+
+        Changes only on movement, NPC edits or new quests, so it can sit in
+        the cached prompt prefix.
         """
-        player = state.player
         location = state.locations.get(state.current_location_id)
         loc_name = location.name if location else "Unknown Location"
         loc_desc = location.description if location else ""
 
-        npcs_here = []
         npcs_here_details = []
         if location:
-            for npc_id in location.npcs:
+            for npc_id in sorted(location.npcs):
                 if npc_id in state.npcs:
-                    npc = state.npcs[npc_id]
-                    npcs_here.append(npc.get("name", npc_id))
-                    
-                    # Build detailed NPC description
-                    npc_detail = f"\n{npc.get('name', npc_id)} ({npc_id}):\n"
-                    npc_detail += f"  Role: {npc.get('role', 'unknown')}\n"
-                    npc_detail += f"  Personality: {npc.get('personality', 'unknown')}\n"
-                    
-                    # Add personality traits if available
-                    if 'personality_traits' in npc:
-                        traits = npc['personality_traits']
-                        npc_detail += f"  Archetype: {traits.get('archetype', 'unknown')}\n"
-                        npc_detail += f"  Temperament: {traits.get('temperament', 'unknown')}\n"
-                        npc_detail += f"  Speech Style: {traits.get('speech_style', 'normal')}\n"
-                        npc_detail += f"  Values: {', '.join(traits.get('values', []))}\n"
-                        npc_detail += f"  Fears: {', '.join(traits.get('fears', []))}\n"
-                        if traits.get('quirks'):
-                            npc_detail += f"  Quirks: {', '.join(traits.get('quirks', []))}\n"
-                    
-                    # Add current goal
-                    if 'current_goal' in npc:
-                        npc_detail += f"  Current Goal: {npc['current_goal']}\n"
-                    
-                    # Add relationship status
-                    relationship = state.npc_relationships.get(npc_id, 0.0)
-                    if relationship >= 0.7:
-                        rel_status = "trusted ally"
-                    elif relationship >= 0.3:
-                        rel_status = "friendly"
-                    elif relationship >= -0.3:
-                        rel_status = "neutral"
-                    elif relationship >= -0.7:
-                        rel_status = "unfriendly"
-                    else:
-                        rel_status = "hostile"
-                    npc_detail += f"  Relationship with player: {rel_status} ({relationship:+.1f})\n"
-                    
-                    # Add mood if available
-                    if 'mood' in npc:
-                        mood = npc['mood']
-                        if mood > 0.3:
-                            mood_status = "happy"
-                        elif mood > -0.3:
-                            mood_status = "neutral"
-                        else:
-                            mood_status = "upset"
-                        npc_detail += f"  Current Mood: {mood_status} ({mood:+.1f})\n"
-                    
-                    npcs_here_details.append(npc_detail)
+                    npcs_here_details.append(_render_npc_block(npc_id, _npc_block_key(state.npcs[npc_id])))
+
+        parts: List[str] = []
+        if npcs_here_details:
+            parts.append("=== NPCs PRESENT ===")
+            parts.extend(npcs_here_details)
+            parts.append("\n")
+
+        parts.append(f"""=== LOCATION ===
+{loc_name}
+{loc_desc}
+""")
 
-        quests_str = ""
         if state.active_quests:
-            quests_str = "Active Quests:\n"
+            parts.append("\nActive Quests:\n")
             for qid, quest in state.active_quests.items():
-                quests_str += f"  - {quest.title}: {quest.description}\n"
+                parts.append(f"  - {quest.title}: {quest.description}\n")
 
-        context = f"""=== CURRENT SITUATION ===
+        return "".join(parts)
+
+    @staticmethod
+    def history_context(state: GameState, max_history_turns: Optional[int] = None) -> str:
+        """
+        Conversation history section (append-only between window resets).
+
+        Args:
+            state: Current game state
+            max_history_turns: Override to include only the last N turns; by default
+                the append-only window starting at state.history_window_start is used
+        """
+        parts: List[str] = []
+        # Older turns survive as a summary that only changes on window resets
+        if state.history_summary:
+            parts.append(f"\n=== STORY SO FAR ===\n{state.history_summary}\n")
+
+        if state.conversation_history:
+            parts.append("\n=== RECENT CONVERSATION HISTORY ===\n")
+            for turn_data in DMPromptBuilder._history_window(state, max_history_turns):
+                parts.append(DMPromptBuilder._format_history_turn(state, turn_data))
+
+        # Fallback to old events log if no conversation history yet
+        elif state.world_events_log:
+            parts.append("\nRecent Events:\n")
+            events = state.world_events_log
+            for event in islice(events, max(0, len(events) - 3), None):  # Last 3 events
+                parts.append(f"  - {format_world_event(event)}\n")
+
+        return "".join(parts)
+
+    @staticmethod
+    def summary_prompt(state: GameState, turns: List[ConversationTurn]) -> tuple:
+        """
+        Construct the prompt that folds turns leaving the history window
+        into state.history_summary.
+
+        Returns:
+            (system_prompt, user_prompt) tuple
+        """
+        parts = [f"=== PREVIOUS SUMMARY ===\n{state.history_summary or 'None yet.'}\n\n=== NEW TURNS ==="]
+        parts.extend(DMPromptBuilder._format_history_turn(state, turn_data) for turn_data in turns)
+        parts.append("\n=== UPDATED SUMMARY ===\n")
+        return _SUMMARY_SYSTEM_PROMPT, "".join(parts)
+
+    @staticmethod
+    def _npc_attitude(state: GameState, npc_id: str) -> str:
+        """Goal, relationship and mood lines for one NPC."""
+        npc = state.npcs[npc_id]
+        text = ""
+        
+        # Add current goal
+        if npc.get('current_goal') is not None:
+            text += f"  Current Goal: {npc['current_goal']}\n"
+        
+        # Add relationship status
+        relationship = state.npc_relationships.get(npc_id, 0.0)
+        rel_status = RELATIONSHIP_STATUSES[bisect_right(RELATIONSHIP_THRESHOLDS, relationship)]
+        text += f"  Relationship with player: {rel_status} ({relationship:+.1f})\n"
+        
+        # Add mood if available
+        if 'mood' in npc:
+            mood = npc['mood']
+            mood_status = MOOD_STATUSES[bisect_left(MOOD_THRESHOLDS, mood)]
+            text += f"  Current Mood: {mood_status} ({mood:+.1f})\n"
+        return text
+
+    @staticmethod
+    def npc_only_prompt(state: GameState, npc_id: str, player_input: str,
+                        max_history_turns: int = 2) -> tuple:
+        """
+        Construct a minimal prompt for one NPC's line of dialog.
+
+        Holds only that NPC's traits and attitude plus the last few turns, so
+        the speeches of several NPCs can be generated in parallel.
+
+        Args:
+            state: Current game state
+            npc_id: NPC to speak (must be in state.npcs)
+            player_input: Player's current action
+            max_history_turns: Recent conversation turns to include
+
+        Returns:
+            (system_prompt, user_prompt) tuple
+        """
+        npc = state.npcs[npc_id]
+        name = npc.get('name', npc_id)
+        system = (
+            f"You are {name}, an NPC in a fantasy tabletop RPG. Stay in character: "
+            f"match your speech style, temperament, values and mood.\n"
+            f"{_render_npc_block(npc_id, _npc_block_key(npc))}"
+            f"{DMPromptBuilder._npc_attitude(state, npc_id)}\n"
+            f"{_NPC_DIALOG_FORMAT}"
+        )
+
+        parts: List[str] = []
+        if state.conversation_history:
+            parts.append("=== RECENT CONVERSATION HISTORY ===\n")
+            for turn_data in DMPromptBuilder._history_window(state, max_history_turns):
+                parts.append(DMPromptBuilder._format_history_turn(state, turn_data))
+            parts.append("\n")
+        parts.append(f"=== PLAYER ACTION ===\n{player_input}\n\n=== {name.upper()} RESPONDS (JSON) ===\n")
+        return system, "".join(parts)
+
+    @staticmethod
+    def state_context(state: GameState) -> str:
+        """
+        Volatile part of the context: turn, time, player stats, NPC attitudes.
+
+        These change every turn, so they go last to keep the prefix cacheable.
+        """
+        player = state.player
+        location = state.locations.get(state.current_location_id)
+
+        parts: List[str] = [f"""
+=== CURRENT SITUATION ===
 Turn: {state.turn}
 Time: {state.game_time}
 
@@ -282,48 +479,52 @@ Class: {player.class_name}
 HP: {player.hp}/{player.max_hp}
 Gold: {player.gold} 💰 (IMPORTANT: Player can only afford items/services they have gold for)
 Inventory: {', '.join(state.player.inventory.items.keys()) if state.player.inventory.items else 'Empty'}
+"""]
 
-=== LOCATION ===
-{loc_name}
-{loc_desc}
-"""
-        if npcs_here:
-            context += f"\n=== NPCs PRESENT ==="
-            for npc_detail in npcs_here_details:
-                context += npc_detail
+        npc_status = []
+        if location:
+            for npc_id in sorted(location.npcs):
+                if npc_id in state.npcs:
+                    npc = state.npcs[npc_id]
+                    npc_status.append(f"\n{npc.get('name', npc_id)} ({npc_id}):\n")
+                    npc_status.append(DMPromptBuilder._npc_attitude(state, npc_id))
 
-        if quests_str:
-            context += f"\n{quests_str}"
+        if npc_status:
+            parts.append("\n=== NPC STATUS ===")
+            parts.extend(npc_status)
 
-        # Add conversation history (recent turns)
-        if state.conversation_history:
-            context += f"\n=== RECENT CONVERSATION HISTORY ===\n"
-            # Get last N turns
-            recent_turns = state.conversation_history[-max_history_turns:]
-            for turn_data in recent_turns:
-                context += f"\nTurn {turn_data.get('turn_number', '?')}:\n"
-                context += f"  Player: {turn_data.get('player_action', '')}\n"
-                context += f"  Narration: {turn_data.get('narration', '')}\n"
-                
-                # Add NPC speeches if any
-                if turn_data.get('npc_speeches'):
-                    for speech in turn_data['npc_speeches']:
-                        npc_name = state.npcs.get(speech.get('npc_id', ''), {}).get('name', speech.get('npc_id', 'Unknown'))
-                        emotion = speech.get('emotion', 'neutral')
-                        text = speech.get('text', '')
-                        context += f"  {npc_name} ({emotion}): \"{text}\"\n"
-                
-                # Add effects summary if any
-                if turn_data.get('effects_summary'):
-                    context += f"  Effects: {', '.join(turn_data['effects_summary'])}\n"
+        return "".join(parts)
 
-        # Fallback to old events log if no conversation history yet
-        elif state.world_events_log:
-            context += f"\nRecent Events:\n"
-            for event in state.world_events_log[-3:]:  # Last 3 events
-                context += f"  - {event}\n"
+    @staticmethod
+    def game_context(state: GameState, max_history_turns: Optional[int] = None) -> str:
+        """
+        Build a context prompt from game state.
+
+        Sections run from most to least stable (world, history, then current
+        state) so consecutive turns share the longest possible prefix.
+        
+        Args:
+            state: Current game state
+            max_history_turns: Override to include only the last N turns; by default
+                the append-only window starting at state.history_window_start is used
+        """
+        return "".join(DMPromptBuilder.context_sections(state, max_history_turns).values()).strip()
+
+    @staticmethod
+    def context_sections(state: GameState, max_history_turns: Optional[int] = None) -> Dict[str, str]:
+        """
+        Build the game context as named sections, in prompt order.
 
-        return context.strip()
+        Lets callers inspect one section without searching the joined text.
+
+        Returns:
+            {"world": ..., "history": ..., "state": ...}
+        """
+        return {
+            "world": DMPromptBuilder.world_context(state),
+            "history": DMPromptBuilder.history_context(state, max_history_turns),
+            "state": DMPromptBuilder.state_context(state),
+        }
 
     @staticmethod
     def construct_full_prompt(
@@ -337,10 +538,8 @@ Inventory: {', '.join(state.player.inventory.items.keys()) if state.player.inven
         Returns:
             (system_prompt, user_prompt) tuple
         """
-        system = DMPromptBuilder.system_prompt() if include_system else ""
-        
-        # Add JSON format to system prompt
-        system += "\n\n" + DMPromptBuilder.json_output_format()
+        # System prompt plus JSON format
+        system = _SYSTEM_PLUS_JSON if include_system else "\n\n" + _JSON_FORMAT
         
         context = DMPromptBuilder.game_context(state)
         
@@ -352,3 +551,51 @@ Inventory: {', '.join(state.player.inventory.items.keys()) if state.player.inven
         user = f"{context}\n\n=== PLAYER ACTION ===\n{player_input}\n\n=== DM RESPONSE (JSON) ===\n"
 
         return system, user
+
+    @staticmethod
+    def construct_messages(state: GameState, player_input: str) -> List[dict]:
+        """
+        Construct a chat message list for LLM providers with prompt caching.
+
+        Layout: system prompt, world context and story summary, one
+        user/assistant pair per turn in the append-only history window, then
+        the volatile state and action. Cache breakpoints sit on the system prompt and the
+        second-to-last history message, so everything but the newest turn
+        is a cached prefix.
+
+        Returns:
+            List of {"role", "content": [content blocks]} messages
+        """
+        messages = [
+            {"role": "system", "content": [
+                _mark({"type": "text", "text": _SYSTEM_PLUS_JSON_STRIPPED}),
+                {"type": "text", "text": DMPromptBuilder.world_context(state).strip()},
+            ]}
+        ]
+        if state.history_summary:
+            messages[0]["content"].append(
+                {"type": "text", "text": f"=== STORY SO FAR ===\n{state.history_summary}"}
+            )
+
+        history = []
+        for turn_data in DMPromptBuilder._history_window(state):
+            history.append({
+                "role": "user",
+                "content": [{"type": "text", "text": f"Turn {turn_data.turn_number}: {turn_data.player_action}"}],
+            })
+            history.append({
+                "role": "assistant",
+                "content": [{"type": "text", "text": DMPromptBuilder._format_dm_turn(state, turn_data).strip()}],
+            })
+        if len(history) >= 2:
+            _mark(history[-2]["content"][-1])
+        messages.extend(history)
+
+        context = DMPromptBuilder.state_context(state).strip()
+        memory_context = DMPromptBuilder.build_memory_context(state, player_input)
+        if memory_context:
+            context += memory_context
+        user = f"{context}\n\n=== PLAYER ACTION ===\n{player_input}\n\n=== DM RESPONSE (JSON) ===\n"
+        messages.append({"role": "user", "content": [{"type": "text", "text": user}]})
+
+        return messages
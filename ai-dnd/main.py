@@ -9,38 +9,45 @@ from datetime import datetime
 # Add repo root to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from engine.state import GameState, Player, Location, Inventory
+from engine.state import GameState, Player, Location, Inventory, intern_npc_ids
 from engine.game_loop import GameEngine
 from llm.client import OllamaClient
 from ui.cli import GameCLI
 
+# Optional fast JSON for the world data files
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Selectable player classes, in menu order; the first is the default
+_CLASSES = ("Warrior", "Rogue", "Mage", "Cleric")
+_CLASS_CHOICES = frozenset(str(i) for i in range(1, len(_CLASSES) + 1))
+
+
+def _load_json(path: str):
+    """Read and parse one JSON data file."""
+    with open(path, "rb") as f:
+        return _json_loads(f.read())
+
 
 def load_world_data():
     """Load world data from JSON files."""
     world = {}
 
     # Load locations
-    with open("data/locations.json", "r") as f:
-        locations_data = json.load(f)
-        world["locations"] = {
-            loc_id: Location(**data) for loc_id, data in locations_data.items()
-        }
+    world["locations"] = {
+        loc_id: Location(**data) for loc_id, data in _load_json("data/locations.json").items()
+    }
 
     # Load NPCs
-    with open("data/npcs.json", "r") as f:
-        world["npcs"] = json.load(f)
-
-    # Load factions
-    with open("data/factions.json", "r") as f:
-        world["factions"] = json.load(f)
-
-    # Load items
-    with open("data/items.json", "r") as f:
-        world["items"] = json.load(f)
+    world["npcs"] = intern_npc_ids(_load_json("data/npcs.json"), world["locations"])
 
-    # Load rules
-    with open("data/rules.json", "r") as f:
-        world["rules"] = json.load(f)
+    # Load factions, items and rules
+    world["factions"] = _load_json("data/factions.json")
+    world["items"] = _load_json("data/items.json")
+    world["rules"] = _load_json("data/rules.json")
 
     return world
 
@@ -52,13 +59,10 @@ def create_new_game(player_name: str = None, player_class: str = None):
 
     if not player_class:
         print("\nChoose your class:")
-        print("  1. Warrior")
-        print("  2. Rogue")
-        print("  3. Mage")
-        print("  4. Cleric")
-        choice = input("Select (1-4): ").strip()
-        class_map = {"1": "Warrior", "2": "Rogue", "3": "Mage", "4": "Cleric"}
-        player_class = class_map.get(choice, "Warrior")
+        for i, class_name in enumerate(_CLASSES, 1):
+            print(f"  {i}. {class_name}")
+        choice = input(f"Select (1-{len(_CLASSES)}): ").strip()
+        player_class = _CLASSES[int(choice) - 1] if choice in _CLASS_CHOICES else _CLASSES[0]
 
     # Load world data
     world = load_world_data()
@@ -135,7 +139,11 @@ def main():
     print("✓ CLI initialized\n")
 
     # Run game
-    cli.main_loop()
+    try:
+        cli.main_loop()
+    finally:
+        cli.close()
+        llm.close()
 
 
 if __name__ == "__main__":
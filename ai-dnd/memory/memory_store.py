@@ -4,10 +4,17 @@ This module provides the MemoryStore class that manages episodic and semantic
 memories using vector embeddings for similarity-based retrieval.
 """
 
+import heapq
+import importlib.util
 import json
 import os
-from datetime import datetime
-from typing import List, Optional, Union, Literal
+import platform
+import threading
+from bisect import bisect_right
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from hashlib import blake2b
+from typing import Callable, List, Optional, Union, Literal
 from pathlib import Path
 
 try:
@@ -18,7 +25,152 @@ except ImportError:
     CHROMADB_AVAILABLE = False
     print("Warning: chromadb not installed. Install with: pip install chromadb sentence-transformers")
 
-from memory.types import Memory, EpisodicMemory, SemanticMemory, create_memory_id
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Optional JIT for ranking large memory stores; numba is only imported (and
+# the kernel compiled) by the first ranking that needs it
+NUMBA_AVAILABLE = NUMPY_AVAILABLE and importlib.util.find_spec("numba") is not None
+
+# Optional fast JSON for save_to_json/load_from_json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Optional columnar binary save format (see save_to_msgpack)
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+from memory.types import (
+    EpisodicMemory, SemanticMemory, create_memory_id, pack_fp16, unpack_fp16
+)
+
+# Memories per ChromaDB add call (one embedding batch)
+MEMORY_BATCH_SIZE = 256
+
+# Per-type columns of the msgpack save format, after the shared Memory fields
+_EPISODIC_COLUMNS = ("importance", "emotion", "location", "participants", "decay_rate", "current_strength")
+_SEMANTIC_COLUMNS = ("fact_type", "subject", "confidence", "source")
+_MEMORY_TABLES = (
+    ("episodic", EpisodicMemory, _EPISODIC_COLUMNS),
+    ("semantic", SemanticMemory, _SEMANTIC_COLUMNS),
+)
+# created_at is stored as integer microseconds since this (naive) epoch
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# HNSW parameters for the memory collection by size: (min memories, M,
+# construction_ef, search_ef). Small stores search less, large ones more.
+HNSW_TIERS = (
+    (0, 16, 64, 40),
+    (100_000, 24, 100, 100),
+    (1_000_000, 32, 200, 200),
+)
+_HNSW_TIER_SIZES = tuple(tier[0] for tier in HNSW_TIERS)
+
+# Below this many episodic memories, get_important_memories stays in Python
+_JIT_RANK_MIN_MEMORIES = 512
+
+# Where int8 ONNX exports of embedding models are kept, shared by every store
+EMBEDDING_EXPORT_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "ai-dnd" / "onnx_int8"
+
+
+def _quantization_config() -> Optional[str]:
+    """sentence-transformers quantization config for this CPU, or None if none fits.
+    
+    One of "arm64", "avx512_vnni", "avx512" or "avx2"; x86 features are read
+    from /proc/cpuinfo, so other x86 hosts assume AVX2.
+    """
+    machine = platform.machine().lower()
+    if machine in ("arm64", "aarch64"):
+        return "arm64"
+    if machine not in ("x86_64", "amd64"):
+        return None
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            flags = next((line.split(":", 1)[1].split() for line in f if line.startswith("flags")), [])
+    except OSError:
+        return "avx2"
+    if "avx512_vnni" in flags:
+        return "avx512_vnni"
+    if "avx512f" in flags:
+        return "avx512"
+    return "avx2" if "avx2" in flags else None
+
+
+# Embedding functions by model name, shared by every MemoryStore in the process
+_embedders: dict = {}
+_embedders_lock = threading.Lock()
+
+
+class QuantizedEmbeddingFunction:
+    """ChromaDB embedding function running an int8-quantized ONNX sentence transformer.
+
+    The quantized export, for this CPU's quantization config, is made once
+    into cache_dir and loaded from there afterwards. Needs
+    sentence-transformers>=3.2 with optimum[onnxruntime].
+    """
+    
+    def __init__(self, model_name: str, cache_dir: Path = EMBEDDING_EXPORT_DIR, batch_size: int = 32):
+        from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+        
+        config = _quantization_config()
+        if config is None:
+            raise RuntimeError(f"no int8 quantization config for {platform.machine()}")
+        model_dir = Path(cache_dir) / model_name.replace("/", "__")
+        file_name = f"onnx/model_qint8_{config}.onnx"
+        if not (model_dir / file_name).exists():
+            model = SentenceTransformer(model_name, backend="onnx")
+            model.save(str(model_dir))
+            export_dynamic_quantized_onnx_model(model, config, str(model_dir))
+        
+        self.model = SentenceTransformer(str(model_dir), backend="onnx", model_kwargs={"file_name": file_name})
+        self.batch_size = batch_size
+        self.backend = f"onnx-qint8-{config}"  # tags cached vectors (see MemoryStore._embedding_backend)
+    
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return self.model.encode(list(input), batch_size=self.batch_size, normalize_embeddings=True).tolist()
+
+
+def _top_important(importance, strength, npc_codes, target_npc, all_npc, min_importance, n):
+    """Indices of the top-n episodic memories by importance * strength.
+    
+    target_npc < 0 matches every NPC; otherwise memories of target_npc
+    rank before shared ("all") ones on ties, like _candidates order.
+    Compiled by _jit_top_important.
+    """
+    mask = (importance >= min_importance) & (strength > 0.1)
+    if target_npc >= 0:
+        mask &= (npc_codes == target_npc) | (npc_codes == all_npc)
+    idx = np.nonzero(mask)[0]
+    if target_npc >= 0:
+        idx = idx[np.argsort(npc_codes[idx] != target_npc, kind="mergesort")]
+    score = importance[idx] * strength[idx]
+    return idx[np.argsort(-score, kind="mergesort")][:n]
+
+
+_TOP_IMPORTANT_JIT = None
+
+
+def _jit_top_important():
+    """The compiled _top_important, built on first call (None if numba won't import)."""
+    global _TOP_IMPORTANT_JIT, NUMBA_AVAILABLE
+    if _TOP_IMPORTANT_JIT is None:
+        try:
+            from numba import njit
+        except ImportError:
+            NUMBA_AVAILABLE = False
+            return None
+        _TOP_IMPORTANT_JIT = njit(cache=True)(_top_important)
+    return _TOP_IMPORTANT_JIT
 
 
 class MemoryStore:
@@ -31,16 +183,39 @@ class MemoryStore:
     - Persistence to JSON for save/load
     """
     
-    def __init__(self, db_path: str = "./data/memory_db", embedding_model: str = "all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        db_path: str = "./data/memory_db",
+        embedding_model: str = "all-MiniLM-L6-v2",
+        embedding_function: Optional[Callable[[List[str]], List[List[float]]]] = None
+    ):
         """Initialize the memory store.
         
         Args:
             db_path: Path to ChromaDB persistent storage
             embedding_model: Sentence transformer model name
+            embedding_function: Callable mapping texts to vectors, used instead
+                of loading embedding_model (e.g. to share one model between stores)
         """
         self.db_path = db_path
         self.embedding_model = embedding_model
         self.memories: dict[str, Union[EpisodicMemory, SemanticMemory]] = {}
+        # Column arrays over episodic memories for vectorized decay (NumPy);
+        # rebuilt lazily after memories are added or removed
+        self._decay_index = None
+        # Memories added but not yet written to ChromaDB (see flush), and
+        # writes in progress on the single background indexing thread
+        self._pending: List[Union[EpisodicMemory, SemanticMemory]] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._writes: List[Future] = []
+        # Content-addressed embeddings (text digest -> vector), so duplicate
+        # memory texts skip the model; persisted in <db_path>/embedding_cache.npz
+        self._embed = embedding_function
+        self._embedding_cache: dict[str, list[float]] = {}
+        self._embedding_cache_dirty = False
+        # Inverted indexes: npc_id / memory_type -> ids (dicts as ordered sets)
+        self._by_npc: dict[str, dict[str, None]] = {}
+        self._by_type: dict[str, dict[str, None]] = {}
         
         # Initialize ChromaDB if available
         self.chroma_available = CHROMADB_AVAILABLE
@@ -58,26 +233,182 @@ class MemoryStore:
             # Create directory if it doesn't exist
             Path(self.db_path).mkdir(parents=True, exist_ok=True)
             
-            # Initialize ChromaDB with sentence transformers
-            sentence_transformer_ef = embedding_functions.SentenceTransformerEmbeddingFunction(
-                model_name=self.embedding_model
-            )
+            sentence_transformer_ef = self._embed or self._embedding_function()
+            self._embed = sentence_transformer_ef
+            self._load_embedding_cache()
             
             self.client = chromadb.PersistentClient(path=self.db_path)
-            self.collection = self.client.get_or_create_collection(
-                name="game_memories",
-                embedding_function=sentence_transformer_ef,
-                metadata={"hnsw:space": "cosine"}
-            )
+            self.collection = self._create_collection()
+            self.retune()
             
             print(f"MemoryStore: ChromaDB initialized at {self.db_path}")
         except Exception as e:
             print(f"Warning: ChromaDB initialization failed: {e}")
             self.chroma_available = False
     
+    @staticmethod
+    def _hnsw_tier(count: int) -> int:
+        return bisect_right(_HNSW_TIER_SIZES, count) - 1
+    
+    @staticmethod
+    def _hnsw_metadata(count: int) -> dict:
+        _, m, construction_ef, search_ef = HNSW_TIERS[MemoryStore._hnsw_tier(count)]
+        return {
+            "hnsw:space": "cosine",
+            "hnsw:M": m,
+            "hnsw:construction_ef": construction_ef,
+            "hnsw:search_ef": search_ef,
+        }
+    
+    def _create_collection(self, count: int = 0, name: str = "game_memories"):
+        """Get or create the memory collection, with HNSW parameters for count memories."""
+        return self.client.get_or_create_collection(
+            name=name,
+            embedding_function=self._embed,
+            metadata=self._hnsw_metadata(count)
+        )
+    
+    def retune(self):
+        """Rebuild the memory collection if its size has moved to another HNSW tier.
+        
+        M and construction_ef are fixed when a collection is created, so a
+        new collection is built with the new parameters from the stored
+        vectors (no re-embedding). It replaces the old one only once it
+        holds every vector; if the rebuild fails, the old one stays in use.
+        Runs on the calling thread, after queued writes have finished.
+        """
+        if not self.chroma_available or not self.collection:
+            return
+        count = self.collection.count()
+        metadata = self._hnsw_metadata(count)
+        if (self.collection.metadata or {}).get("hnsw:M") == metadata["hnsw:M"]:
+            return
+        
+        rebuild_name = "game_memories_retune"
+        try:
+            self.client.delete_collection(rebuild_name)  # left over from an interrupted retune
+        except Exception:
+            pass
+        try:
+            stored = self.collection.get(include=["embeddings", "documents", "metadatas"])
+            rebuilt = self._create_collection(count, name=rebuild_name)
+            for start in range(0, len(stored["ids"]), MEMORY_BATCH_SIZE):
+                end = start + MEMORY_BATCH_SIZE
+                rebuilt.add(
+                    ids=stored["ids"][start:end],
+                    embeddings=stored["embeddings"][start:end],
+                    documents=stored["documents"][start:end],
+                    metadatas=stored["metadatas"][start:end]
+                )
+            if rebuilt.count() != len(stored["ids"]):
+                raise RuntimeError(f"rebuilt collection holds {rebuilt.count()} of {len(stored['ids'])} vectors")
+        except Exception as e:
+            print(f"Warning: HNSW retune failed, keeping the current index: {e}")
+            try:
+                self.client.delete_collection(rebuild_name)
+            except Exception:
+                pass
+            return
+        
+        self.client.delete_collection("game_memories")
+        rebuilt.modify(name="game_memories")
+        self.collection = rebuilt
+        print(f"MemoryStore: Retuned HNSW for {count} memories (M={metadata['hnsw:M']})")
+    
+    def _embedding_function(self):
+        """Embedding function for this store's model, loaded once per process."""
+        with _embedders_lock:
+            embedder = _embedders.get(self.embedding_model)
+            if embedder is None:
+                embedder = _embedders[self.embedding_model] = self._load_embedding_function()
+        return embedder
+    
+    def _load_embedding_function(self):
+        """Int8 ONNX embeddings when the backend is installed, else the FP32 sentence transformer."""
+        try:
+            return QuantizedEmbeddingFunction(self.embedding_model)
+        except Exception as e:
+            print(f"MemoryStore: Quantized ONNX embeddings unavailable ({e}), using PyTorch")
+            return embedding_functions.SentenceTransformerEmbeddingFunction(
+                model_name=self.embedding_model
+            )
+    
+    @staticmethod
+    def _text_digest(text: str) -> str:
+        return blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+    
+    def _embed_texts(self, texts: List[str]) -> List[list[float]]:
+        """Embeddings for texts, running the model only on texts not seen before."""
+        digests = [self._text_digest(text) for text in texts]
+        cache = self._embedding_cache
+        missing = {}
+        for digest, text in zip(digests, texts):
+            if digest not in cache:
+                missing.setdefault(digest, text)
+        if missing:
+            for digest, vector in zip(missing, self._embed(list(missing.values()))):
+                cache[digest] = [float(x) for x in vector]
+            self._embedding_cache_dirty = True
+        return [cache[digest] for digest in digests]
+    
+    def _batch_embeddings(self, batch: List[Union[EpisodicMemory, SemanticMemory]]) -> List[list[float]]:
+        """Vectors for a ChromaDB write, reusing each memory's persisted embedding.
+        
+        Only memories without one are encoded; the result is kept on the
+        memory so the next save carries it and the next load skips the model.
+        """
+        missing = [memory for memory in batch if memory.embedding is None]
+        if missing:
+            for memory, vector in zip(missing, self._embed_texts([memory.text for memory in missing])):
+                memory.embedding = vector
+        return [memory.embedding for memory in batch]
+    
+    def _embedding_backend(self) -> str:
+        """What computes this store's embeddings; cached vectors from another backend are not reused."""
+        embed = self._embed
+        return getattr(embed, "backend", None) or getattr(embed, "__qualname__", None) or type(embed).__qualname__
+    
+    def _embedding_cache_path(self) -> Path:
+        return Path(self.db_path) / "embedding_cache.npz"
+    
+    def _load_embedding_cache(self):
+        """Load cached embeddings made with the current embedding model and backend."""
+        path = self._embedding_cache_path()
+        if not NUMPY_AVAILABLE or not path.exists():
+            return
+        try:
+            with np.load(path) as data:
+                if str(data["model"]) != self.embedding_model:
+                    return
+                if "backend" not in data.files or str(data["backend"]) != self._embedding_backend():
+                    return
+                self._embedding_cache = dict(zip(data["digests"].tolist(), data["vectors"].tolist()))
+        except Exception as e:
+            print(f"Warning: Failed to load embedding cache: {e}")
+    
+    def _save_embedding_cache(self):
+        """Write the embedding cache as digests plus one float32 matrix."""
+        if not NUMPY_AVAILABLE or not self._embedding_cache_dirty:
+            return
+        try:
+            np.savez(
+                self._embedding_cache_path(),
+                model=np.array(self.embedding_model),
+                backend=np.array(self._embedding_backend()),
+                digests=np.array(list(self._embedding_cache)),
+                vectors=np.array(list(self._embedding_cache.values()), dtype=np.float32),
+            )
+            self._embedding_cache_dirty = False
+        except Exception as e:
+            print(f"Warning: Failed to save embedding cache: {e}")
+    
     def add_memory(self, memory: Union[EpisodicMemory, SemanticMemory]) -> str:
         """Add a memory to the store.
         
+        The ChromaDB write is queued and sent with others in one batch on a
+        background thread, on flush() or before the next query (see
+        add_memories).
+        
         Args:
             memory: Memory object to store
             
@@ -89,40 +420,136 @@ class MemoryStore:
             memory.id = create_memory_id()
         
         # Store in local dict
+        self._index_remove(self.memories.get(memory.id))
         self.memories[memory.id] = memory
+        self._index_add(memory)
+        self._decay_index = None
+        
+        # Queue for ChromaDB if available
+        if self.chroma_available and self.collection:
+            self._pending.append(memory)
+            if len(self._pending) >= MEMORY_BATCH_SIZE:
+                self.flush(wait=False)
+        
+        return memory.id
+    
+    def add_memories(self, memories: List[Union[EpisodicMemory, SemanticMemory]]) -> List[str]:
+        """Add several memories, embedding and writing them to ChromaDB in batches.
+        
+        Args:
+            memories: Memory objects to store
+            
+        Returns:
+            Memory IDs, in input order
+        """
+        for memory in memories:
+            if not memory.id:
+                memory.id = create_memory_id()
+            self._index_remove(self.memories.get(memory.id))
+            self.memories[memory.id] = memory
+            self._index_add(memory)
+        self._decay_index = None
         
-        # Add to ChromaDB if available
         if self.chroma_available and self.collection:
+            self._pending.extend(memories)
+            self.flush(wait=False)
+        
+        return [memory.id for memory in memories]
+    
+    def flush(self, wait: bool = True):
+        """Write queued memories to ChromaDB on the background indexing thread.
+        
+        Embedding runs off the calling thread (the model's kernels release
+        the GIL); one worker keeps writes in order.
+        
+        Args:
+            wait: Block until every write so far has finished, then
+                retune the index if it has grown into another HNSW tier.
+                Anything that reads or deletes from ChromaDB flushes with
+                wait=True first.
+        """
+        pending, self._pending = self._pending, []
+        if pending and self.chroma_available and self.collection:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-index")
+            self._writes.append(self._executor.submit(self._write_memories, pending))
+        if wait:
+            writes, self._writes = self._writes, []
+            for write in writes:
+                write.result()
+            if writes:
+                # The collection may have grown into another HNSW tier
+                self.retune()
+    
+    def _write_memories(self, pending: List[Union[EpisodicMemory, SemanticMemory]]):
+        """Add memories to ChromaDB, MEMORY_BATCH_SIZE per add call."""
+        for start in range(0, len(pending), MEMORY_BATCH_SIZE):
+            batch = pending[start:start + MEMORY_BATCH_SIZE]
             try:
-                metadata = {
-                    "npc_id": memory.npc_id,
-                    "memory_type": memory.memory_type,
-                    "created_at": memory.created_at.isoformat(),
-                }
-                
-                # Add type-specific metadata
-                if isinstance(memory, EpisodicMemory):
-                    metadata.update({
-                        "importance": memory.importance,
-                        "emotion": memory.emotion,
-                        "location": memory.location,
-                        "current_strength": memory.current_strength
-                    })
-                elif isinstance(memory, SemanticMemory):
-                    metadata.update({
-                        "fact_type": memory.fact_type,
-                        "confidence": memory.confidence
-                    })
-                
                 self.collection.add(
-                    ids=[memory.id],
-                    documents=[memory.text],
-                    metadatas=[metadata]
+                    ids=[memory.id for memory in batch],
+                    documents=[memory.text for memory in batch],
+                    embeddings=self._batch_embeddings(batch) if self._embed else None,
+                    metadatas=[self._chroma_metadata(memory) for memory in batch]
                 )
             except Exception as e:
-                print(f"Warning: Failed to add memory to ChromaDB: {e}")
+                print(f"Warning: Failed to add {len(batch)} memories to ChromaDB: {e}")
+    
+    def _index_add(self, memory: Union[EpisodicMemory, SemanticMemory]):
+        self._by_npc.setdefault(memory.npc_id, {})[memory.id] = None
+        self._by_type.setdefault(memory.memory_type, {})[memory.id] = None
+    
+    def _index_remove(self, memory: Optional[Union[EpisodicMemory, SemanticMemory]]):
+        if memory is None:
+            return
+        self._by_npc.get(memory.npc_id, {}).pop(memory.id, None)
+        self._by_type.get(memory.memory_type, {}).pop(memory.id, None)
+    
+    def _candidates(
+        self,
+        npc_id: Optional[str] = None,
+        memory_type: Optional[str] = None
+    ) -> List[Union[EpisodicMemory, SemanticMemory]]:
+        """Memories of npc_id (plus shared "all" memories) and memory_type, via the indexes."""
+        if npc_id:
+            ids = list(self._by_npc.get(npc_id, ()))
+            if npc_id != "all":
+                ids.extend(self._by_npc.get("all", ()))
+            if memory_type:
+                of_type = self._by_type.get(memory_type, {})
+                ids = [mem_id for mem_id in ids if mem_id in of_type]
+        elif memory_type:
+            ids = self._by_type.get(memory_type, ())
+        else:
+            return list(self.memories.values())
+        return [self.memories[mem_id] for mem_id in ids]
+    
+    @staticmethod
+    def _chroma_metadata(memory: Union[EpisodicMemory, SemanticMemory]) -> dict:
+        """ChromaDB metadata for a memory (used for filtering and inspection).
         
-        return memory.id
+        Strength is left out: it changes with game time and is computed
+        locally when memories are queried.
+        """
+        metadata = {
+            "npc_id": memory.npc_id,
+            "memory_type": memory.memory_type,
+            "created_at": memory.created_at.isoformat(),
+        }
+        
+        # Add type-specific metadata
+        if isinstance(memory, EpisodicMemory):
+            metadata.update({
+                "importance": memory.importance,
+                "emotion": memory.emotion,
+                "location": memory.location
+            })
+        elif isinstance(memory, SemanticMemory):
+            metadata.update({
+                "fact_type": memory.fact_type,
+                "confidence": memory.confidence
+            })
+        return metadata
     
     def retrieve_memories(
         self,
@@ -130,7 +557,8 @@ class MemoryStore:
         npc_id: Optional[str] = None,
         memory_type: Optional[Literal["episodic", "semantic"]] = None,
         min_importance: float = 0.0,
-        n: int = 5
+        n: int = 5,
+        current_time: Optional[datetime] = None
     ) -> List[Union[EpisodicMemory, SemanticMemory]]:
         """Retrieve relevant memories using semantic similarity.
         
@@ -140,6 +568,8 @@ class MemoryStore:
             memory_type: Filter by memory type (None for both)
             min_importance: Minimum importance threshold for episodic memories
             n: Number of memories to return
+            current_time: Game time to compute episodic strength at (defaults
+                to the strength from the last decay_memories call)
             
         Returns:
             List of relevant memories, sorted by relevance
@@ -148,39 +578,45 @@ class MemoryStore:
             # Fallback: return most recent memories
             return self._fallback_retrieve(npc_id, memory_type, n)
         
+        self.flush()
         try:
-            # Build filter
-            where_filter = {}
+            # Build filter; importance is static metadata, so ChromaDB prunes on it
+            clauses = []
             if npc_id:
-                where_filter["npc_id"] = npc_id
+                clauses.append({"npc_id": npc_id})
             if memory_type:
-                where_filter["memory_type"] = memory_type
+                clauses.append({"memory_type": memory_type})
+            if min_importance > 0 and memory_type != "semantic":
+                importance = {"importance": {"$gte": min_importance}}
+                clauses.append(importance if memory_type else {"$or": [{"memory_type": "semantic"}, importance]})
+            where_filter = {"$and": clauses} if len(clauses) > 1 else (clauses[0] if clauses else None)
             
             # Query ChromaDB
             results = self.collection.query(
                 query_texts=[query],
-                n_results=n * 2,  # Get more to filter
-                where=where_filter if where_filter else None
+                n_results=n * 2,  # Get more to filter by strength
+                where=where_filter
             )
             
             # Extract memory IDs
             memory_ids = results['ids'][0] if results['ids'] else []
             
-            # Get full memory objects and filter
+            # Get full memory objects; strength depends on game time, so it
+            # is checked here rather than in ChromaDB
             memories = []
             for mem_id in memory_ids:
-                if mem_id in self.memories:
-                    memory = self.memories[mem_id]
-                    
-                    # Filter by importance for episodic memories
-                    if isinstance(memory, EpisodicMemory):
-                        if memory.importance >= min_importance and memory.current_strength > 0.1:
-                            memories.append(memory)
-                    else:
-                        memories.append(memory)
-                    
-                    if len(memories) >= n:
-                        break
+                memory = self.memories.get(mem_id)
+                if memory is None:
+                    continue
+                if isinstance(memory, EpisodicMemory):
+                    strength = (
+                        memory.calculate_strength(current_time) if current_time else memory.current_strength
+                    )
+                    if strength <= 0.1:
+                        continue
+                memories.append(memory)
+                if len(memories) >= n:
+                    break
             
             return memories
         
@@ -195,17 +631,8 @@ class MemoryStore:
         n: int
     ) -> List[Union[EpisodicMemory, SemanticMemory]]:
         """Fallback retrieval without semantic search."""
-        filtered = []
-        for memory in self.memories.values():
-            if npc_id and memory.npc_id not in [npc_id, "all"]:
-                continue
-            if memory_type and memory.memory_type != memory_type:
-                continue
-            filtered.append(memory)
-        
-        # Sort by creation time (most recent first)
-        filtered.sort(key=lambda m: m.created_at, reverse=True)
-        return filtered[:n]
+        # Most recent first
+        return heapq.nlargest(n, self._candidates(npc_id, memory_type), key=lambda m: m.created_at)
     
     def get_npc_memories(self, npc_id: str) -> List[Union[EpisodicMemory, SemanticMemory]]:
         """Get all memories for a specific NPC.
@@ -216,10 +643,7 @@ class MemoryStore:
         Returns:
             List of all memories belonging to this NPC
         """
-        return [
-            memory for memory in self.memories.values()
-            if memory.npc_id == npc_id or memory.npc_id == "all"
-        ]
+        return self._candidates(npc_id)
     
     def get_important_memories(
         self,
@@ -237,18 +661,28 @@ class MemoryStore:
         Returns:
             List of important episodic memories
         """
-        memories = []
-        for memory in self.memories.values():
-            if not isinstance(memory, EpisodicMemory):
-                continue
-            if npc_id and memory.npc_id not in [npc_id, "all"]:
-                continue
-            if memory.importance >= min_importance and memory.current_strength > 0.1:
-                memories.append(memory)
+        top_important = None
+        if NUMBA_AVAILABLE and len(self._by_type.get("episodic", ())) >= _JIT_RANK_MIN_MEMORIES:
+            top_important = _jit_top_important()
+        if top_important is not None:
+            index = self._episodic_index(datetime.now())
+            code_of = index["npc_code_of"]
+            top = top_important(
+                index["importance"], index["strength"], index["npc_codes"],
+                code_of.get(npc_id, len(code_of)) if npc_id else -1,
+                -1 if npc_id == "all" else code_of.get("all", -1),
+                min_importance, n,
+            )
+            episodic = index["episodic"]
+            return [episodic[i] for i in top.tolist()]
         
-        # Sort by importance * strength
-        memories.sort(key=lambda m: m.importance * m.current_strength, reverse=True)
-        return memories[:n]
+        memories = [
+            memory for memory in self._candidates(npc_id, "episodic")
+            if memory.importance >= min_importance and memory.current_strength > 0.1
+        ]
+        
+        # Top n by importance * strength
+        return heapq.nlargest(n, memories, key=lambda m: m.importance * m.current_strength)
     
     def decay_memories(self, current_time: datetime):
         """Update strength of all episodic memories based on time decay.
@@ -256,13 +690,50 @@ class MemoryStore:
         Args:
             current_time: Current game time
         """
-        for memory in self.memories.values():
-            if isinstance(memory, EpisodicMemory):
-                memory.update_strength(current_time)
+        if NUMPY_AVAILABLE:
+            self._decay_vectorized(current_time)
+        else:
+            for memory in self.memories.values():
+                if isinstance(memory, EpisodicMemory):
+                    memory.update_strength(current_time)
+    
+    def _episodic_index(self, current_time: datetime) -> dict:
+        """Column arrays over episodic memories, rebuilt after adds/removes.
         
-        # Update ChromaDB metadata if available
-        if self.chroma_available and self.collection:
-            self._sync_to_chromadb()
+        "strength" mirrors current_strength as of the last decay.
+        """
+        if self._decay_index is None:
+            episodic = [m for m in self.memories.values() if isinstance(m, EpisodicMemory)]
+            ref_time = episodic[0].created_at if episodic else current_time
+            importance = np.array([m.importance for m in episodic], dtype=np.float64)
+            npc_code_of: dict[str, int] = {}
+            self._decay_index = {
+                "episodic": episodic,
+                "ref_time": ref_time,
+                "created": np.array([(m.created_at - ref_time).total_seconds() for m in episodic], dtype=np.float64),
+                # High importance memories decay slower
+                "effective_decay": np.array([m.decay_rate for m in episodic], dtype=np.float64) * (1.0 - importance * 0.5),
+                "importance": importance,
+                "strength": np.array([m.current_strength for m in episodic], dtype=np.float64),
+                "npc_codes": np.array(
+                    [npc_code_of.setdefault(m.npc_id, len(npc_code_of)) for m in episodic], dtype=np.int64
+                ),
+                "npc_code_of": npc_code_of,
+            }
+        return self._decay_index
+    
+    def _decay_vectorized(self, current_time: datetime):
+        """Apply EpisodicMemory.calculate_strength to all episodic memories at once."""
+        index = self._episodic_index(current_time)
+        episodic = index["episodic"]
+        if not episodic:
+            return
+        
+        hours = ((current_time - index["ref_time"]).total_seconds() - index["created"]) / 3600
+        strengths = np.clip(np.exp(-index["effective_decay"] * hours / 100), 0.0, 1.0)
+        index["strength"] = strengths
+        for memory, strength in zip(episodic, strengths.tolist()):
+            memory.current_strength = strength
     
     def prune_weak_memories(self, threshold: float = 0.1):
         """Remove episodic memories that have decayed below threshold.
@@ -270,14 +741,24 @@ class MemoryStore:
         Args:
             threshold: Minimum strength to keep
         """
-        to_delete = []
-        for mem_id, memory in self.memories.items():
-            if isinstance(memory, EpisodicMemory) and memory.current_strength < threshold:
-                to_delete.append(mem_id)
+        if NUMPY_AVAILABLE:
+            index = self._episodic_index(datetime.now())
+            episodic = index["episodic"]
+            to_delete = [episodic[i].id for i in np.flatnonzero(index["strength"] < threshold).tolist()]
+        else:
+            to_delete = [
+                mem_id for mem_id, memory in self.memories.items()
+                if isinstance(memory, EpisodicMemory) and memory.current_strength < threshold
+            ]
+        
+        # Write queued memories first so the ChromaDB delete below covers them
+        self.flush()
         
         # Delete from local storage
         for mem_id in to_delete:
-            del self.memories[mem_id]
+            self._index_remove(self.memories.pop(mem_id))
+        if to_delete:
+            self._decay_index = None
         
         # Delete from ChromaDB
         if self.chroma_available and self.collection and to_delete:
@@ -289,34 +770,85 @@ class MemoryStore:
         if to_delete:
             print(f"Pruned {len(to_delete)} weak memories")
     
-    def _sync_to_chromadb(self):
-        """Sync all memories to ChromaDB (useful after decay updates)."""
-        if not self.chroma_available or not self.collection:
-            return
-        
-        try:
-            # Update all episodic memories with current strength
-            for mem_id, memory in self.memories.items():
-                if isinstance(memory, EpisodicMemory):
-                    self.collection.update(
-                        ids=[mem_id],
-                        metadatas=[{"current_strength": memory.current_strength}]
-                    )
-        except Exception as e:
-            print(f"Warning: Failed to sync to ChromaDB: {e}")
-    
     def save_to_json(self, filepath: str):
         """Save all memories to JSON file.
         
         Args:
             filepath: Path to save JSON file
         """
+        self.flush()  # embeddings are filled in by the indexing thread
         data = {
             "memories": [memory.to_dict() for memory in self.memories.values()]
         }
         
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=2)
+        if ORJSON_AVAILABLE:
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(filepath, 'w') as f:
+                json.dump(data, f, indent=2)
+        
+        self._save_embedding_cache()
+    
+    def save_to_msgpack(self, filepath: str):
+        """Save all memories to a columnar msgpack file (requires msgspec).
+        
+        Each memory type is one table of parallel columns; created_at is
+        integer microseconds and embeddings are packed fp16 bytes, so
+        loading needs no per-row ISO or base64 parsing.
+        
+        Args:
+            filepath: Path to save msgpack file
+        """
+        self.flush()
+        tables = {}
+        for memory_type, cls, columns in _MEMORY_TABLES:
+            rows = [m for m in self.memories.values() if isinstance(m, cls)]
+            table = {
+                "id": [m.id for m in rows],
+                "text": [m.text for m in rows],
+                "npc_id": [m.npc_id for m in rows],
+                "created_at": [(m.created_at - _EPOCH) // _MICROSECOND for m in rows],
+                "embedding": [None if m.embedding is None else pack_fp16(m.embedding) for m in rows],
+            }
+            for column in columns:
+                table[column] = [getattr(m, column) for m in rows]
+            tables[memory_type] = table
+        
+        with open(filepath, 'wb') as f:
+            f.write(msgspec.msgpack.encode({"format": 1, "tables": tables}))
+        
+        self._save_embedding_cache()
+    
+    def load_from_msgpack(self, filepath: str):
+        """Load memories saved by save_to_msgpack.
+        
+        Args:
+            filepath: Path to msgpack file
+        """
+        if not os.path.exists(filepath):
+            return
+        
+        with open(filepath, 'rb') as f:
+            tables = msgspec.msgpack.decode(f.read())["tables"]
+        
+        memories = []
+        for memory_type, cls, columns in _MEMORY_TABLES:
+            table = tables.get(memory_type)
+            if not table:
+                continue
+            names = ("id", "text", "npc_id", "created_at", "embedding") + columns
+            for values in zip(*(table[name] for name in names)):
+                fields = dict(zip(names, values))
+                fields["created_at"] = _EPOCH + fields["created_at"] * _MICROSECOND
+                if fields["embedding"] is not None:
+                    fields["embedding"] = unpack_fp16(fields["embedding"])
+                memories.append(cls(memory_type=memory_type, **fields))
+        
+        self._reset()
+        self.add_memories(memories)
+        
+        print(f"Loaded {len(self.memories)} memories from {filepath}")
     
     def load_from_json(self, filepath: str):
         """Load memories from JSON file.
@@ -327,59 +859,42 @@ class MemoryStore:
         if not os.path.exists(filepath):
             return
         
-        with open(filepath, 'r') as f:
-            data = json.load(f)
+        if ORJSON_AVAILABLE:
+            with open(filepath, 'rb') as f:
+                data = orjson.loads(f.read())
+        else:
+            with open(filepath, 'r') as f:
+                data = json.load(f)
         
-        # Clear existing memories
-        self.memories.clear()
-        if self.chroma_available and self.collection:
-            try:
-                # Clear ChromaDB collection
-                self.collection.delete(where={})
-            except:
-                pass
+        self._reset()
         
-        # Load memories
+        # Load memories, re-adding them to ChromaDB in batches
+        memories = []
         for mem_dict in data.get("memories", []):
             if mem_dict["memory_type"] == "episodic":
-                memory = EpisodicMemory.from_dict(mem_dict)
+                memories.append(EpisodicMemory.from_dict(mem_dict))
             else:
-                memory = SemanticMemory.from_dict(mem_dict)
-            
-            self.memories[memory.id] = memory
-            
-            # Re-add to ChromaDB
-            if self.chroma_available and self.collection:
-                try:
-                    metadata = {
-                        "npc_id": memory.npc_id,
-                        "memory_type": memory.memory_type,
-                        "created_at": memory.created_at.isoformat(),
-                    }
-                    
-                    if isinstance(memory, EpisodicMemory):
-                        metadata.update({
-                            "importance": memory.importance,
-                            "emotion": memory.emotion,
-                            "location": memory.location,
-                            "current_strength": memory.current_strength
-                        })
-                    elif isinstance(memory, SemanticMemory):
-                        metadata.update({
-                            "fact_type": memory.fact_type,
-                            "confidence": memory.confidence
-                        })
-                    
-                    self.collection.add(
-                        ids=[memory.id],
-                        documents=[memory.text],
-                        metadatas=[metadata]
-                    )
-                except Exception as e:
-                    print(f"Warning: Failed to load memory into ChromaDB: {e}")
+                memories.append(SemanticMemory.from_dict(mem_dict))
+        self.add_memories(memories)
         
         print(f"Loaded {len(self.memories)} memories from {filepath}")
     
+    def _reset(self):
+        """Clear existing memories, locally and in ChromaDB."""
+        self._pending.clear()
+        self.flush()
+        self.memories.clear()
+        self._by_npc.clear()
+        self._by_type.clear()
+        self._decay_index = None
+        if self.chroma_available and self.collection:
+            try:
+                # Drop and recreate the collection rather than deleting every row
+                self.client.delete_collection("game_memories")
+                self.collection = self._create_collection()
+            except Exception as e:
+                print(f"Warning: Failed to clear ChromaDB collection: {e}")
+    
     def delete_memory(self, memory_id: str):
         """Delete a specific memory.
         
@@ -387,8 +902,10 @@ class MemoryStore:
             memory_id: ID of memory to delete
         """
         if memory_id in self.memories:
-            del self.memories[memory_id]
+            self._index_remove(self.memories.pop(memory_id))
+            self._decay_index = None
         
+        self.flush()
         if self.chroma_available and self.collection:
             try:
                 self.collection.delete(ids=[memory_id])
@@ -401,12 +918,10 @@ class MemoryStore:
         Returns:
             Dictionary with memory statistics
         """
-        episodic_count = sum(1 for m in self.memories.values() if isinstance(m, EpisodicMemory))
-        semantic_count = sum(1 for m in self.memories.values() if isinstance(m, SemanticMemory))
-        
+        # Counts come from the memory_type index, kept current on add/delete/prune/load
         return {
             "total_memories": len(self.memories),
-            "episodic_memories": episodic_count,
-            "semantic_memories": semantic_count,
+            "episodic_memories": len(self._by_type.get("episodic", ())),
+            "semantic_memories": len(self._by_type.get("semantic", ())),
             "chromadb_enabled": self.chroma_available
         }
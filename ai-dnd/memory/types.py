@@ -5,13 +5,58 @@ This module defines different types of memories that NPCs can have:
 - SemanticMemory: General facts that persist indefinitely
 """
 
+import base64
+import math
+import struct
+import sys
 from dataclasses import dataclass, field
 from datetime import datetime
+from itertools import count
 from typing import Literal, Optional
 from uuid import uuid4
 
+# Slotted dataclasses (3.10+) drop the per-instance __dict__; a copy of
+# engine.response_schema's, as engine imports this package
+DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
 
-@dataclass
+# How embeddings are stored in saved memories: "fp16" (half the bytes of
+# float32) or "int8" (a quarter, with one scale per vector)
+EMBEDDING_DTYPE = "fp16"
+
+
+def pack_fp16(vector: list[float]) -> bytes:
+    """Little-endian half floats for an embedding."""
+    return struct.pack(f"<{len(vector)}e", *vector)
+
+
+def unpack_fp16(raw: bytes) -> list[float]:
+    """Inverse of pack_fp16."""
+    return list(struct.unpack(f"<{len(raw) // 2}e", raw))
+
+
+def encode_embedding(vector: list[float], dtype: str = EMBEDDING_DTYPE) -> dict:
+    """Pack an embedding into base64 fields for a memory dict."""
+    n = len(vector)
+    if dtype == "int8":
+        scale = max(abs(x) for x in vector) or 1.0
+        raw = struct.pack(f"<{n}b", *(round(x / scale * 127) for x in vector))
+        return {"embedding": base64.b64encode(raw).decode("ascii"), "embedding_dtype": "int8", "embedding_scale": scale}
+    return {"embedding": base64.b64encode(pack_fp16(vector)).decode("ascii"), "embedding_dtype": "fp16"}
+
+
+def decode_embedding(data: dict) -> Optional[list[float]]:
+    """Read the embedding from a memory dict (packed, or a plain list in older saves)."""
+    embedding = data.get("embedding")
+    if not isinstance(embedding, str):
+        return embedding
+    raw = base64.b64decode(embedding)
+    if data.get("embedding_dtype") == "int8":
+        step = data["embedding_scale"] / 127
+        return [q * step for q in struct.unpack(f"<{len(raw)}b", raw)]
+    return unpack_fp16(raw)
+
+
+@dataclass(**DATACLASS_SLOTS)
 class Memory:
     """Base memory class for all memory types."""
     
@@ -30,7 +75,7 @@ class Memory:
             "text": self.text,
             "npc_id": self.npc_id,
             "created_at": self.created_at.isoformat(),
-            "embedding": self.embedding
+            **(encode_embedding(self.embedding) if self.embedding is not None else {"embedding": None})
         }
     
     @classmethod
@@ -40,7 +85,7 @@ class Memory:
         raise NotImplementedError("Use EpisodicMemory or SemanticMemory from_dict")
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class EpisodicMemory(Memory):
     """Event-based memory that decays over time.
     
@@ -80,7 +125,6 @@ class EpisodicMemory(Memory):
         effective_decay = self.decay_rate * (1.0 - self.importance * 0.5)
         
         # Exponential decay: strength = initial * e^(-decay * time)
-        import math
         strength = math.exp(-effective_decay * time_delta / 100)  # /100 to make decay reasonable
         
         return max(0.0, min(1.0, strength))
@@ -91,7 +135,7 @@ class EpisodicMemory(Memory):
     
     def to_dict(self) -> dict:
         """Convert episodic memory to dictionary."""
-        base_dict = super().to_dict()
+        base_dict = Memory.to_dict(self)
         base_dict.update({
             "importance": self.importance,
             "emotion": self.emotion,
@@ -113,7 +157,7 @@ class EpisodicMemory(Memory):
             text=data["text"],
             npc_id=data["npc_id"],
             created_at=created_at,
-            embedding=data.get("embedding"),
+            embedding=decode_embedding(data),
             importance=data.get("importance", 0.5),
             emotion=data.get("emotion", "neutral"),
             location=data.get("location", ""),
@@ -123,7 +167,7 @@ class EpisodicMemory(Memory):
         )
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class SemanticMemory(Memory):
     """Fact-based memory that doesn't decay.
     
@@ -147,7 +191,7 @@ class SemanticMemory(Memory):
     
     def to_dict(self) -> dict:
         """Convert semantic memory to dictionary."""
-        base_dict = super().to_dict()
+        base_dict = Memory.to_dict(self)
         base_dict.update({
             "fact_type": self.fact_type,
             "subject": self.subject,
@@ -167,7 +211,7 @@ class SemanticMemory(Memory):
             text=data["text"],
             npc_id=data["npc_id"],
             created_at=created_at,
-            embedding=data.get("embedding"),
+            embedding=decode_embedding(data),
             fact_type=data.get("fact_type", "general"),
             subject=data.get("subject", ""),
             confidence=data.get("confidence", 1.0),
@@ -175,6 +219,11 @@ class SemanticMemory(Memory):
         )
 
 
+# Per-process random salt plus a counter: unique IDs without os.urandom per call
+_ID_SALT = uuid4().hex[:8]
+_ID_COUNTER = count()
+
+
 def create_memory_id() -> str:
     """Generate a unique memory ID."""
-    return f"mem_{uuid4().hex[:8]}"
+    return f"mem_{_ID_SALT}{next(_ID_COUNTER):08x}"
@@ -3,10 +3,11 @@
 
 import sys
 import os
+from itertools import islice
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from engine.state import GameState, Player, Location, Inventory
+from engine.state import ConversationTurn, GameState, Player, Location, Inventory
 from llm.prompts import DMPromptBuilder
 import json
 
@@ -22,7 +23,7 @@ def demo_npc_personalities():
     
     print("\n1. NPCs Now Have Rich Personalities:")
     print("-" * 70)
-    for npc_id, npc in list(npcs.items())[:3]:
+    for npc_id, npc in islice(npcs.items(), 3):
         print(f"\n{npc['name']} - {npc['role']}")
         traits = npc.get('personality_traits', {})
         print(f"  Archetype: {traits.get('archetype', 'N/A')}")
@@ -56,53 +57,51 @@ def demo_npc_personalities():
     )
     
     # Add conversation history
-    state.conversation_history.append({
-        'turn_number': 1,
-        'player_action': 'I walk up to the bar',
-        'narration': 'The bartender glances up from polishing a glass.',
-        'npc_speeches': [
+    state.conversation_history.append(ConversationTurn(
+        turn_number=1,
+        player_action='I walk up to the bar',
+        narration='The bartender glances up from polishing a glass.',
+        npc_speeches=[
             {'npc_id': 'bartender', 'text': 'What can I get you?', 'emotion': 'gruff'}
         ],
-        'effects_summary': [],
-        'timestamp': '2025-01-01T18:00:00'
-    })
+        effects_summary=[],
+        timestamp='2025-01-01T18:00:00'
+    ))
     
-    state.conversation_history.append({
-        'turn_number': 2,
-        'player_action': 'I ask if she knows anything about the thieves',
-        'narration': 'Mira leans in, her expression serious.',
-        'npc_speeches': [
+    state.conversation_history.append(ConversationTurn(
+        turn_number=2,
+        player_action='I ask if she knows anything about the thieves',
+        narration='Mira leans in, her expression serious.',
+        npc_speeches=[
             {'npc_id': 'bartender', 'text': "Keep your voice down. The guard captain's been asking questions.", 'emotion': 'cautious'}
         ],
-        'effects_summary': ['🤝 Mira: +0.1 (friendly)'],
-        'timestamp': '2025-01-01T18:05:00'
-    })
+        effects_summary=['🤝 Mira: +0.1 (friendly)'],
+        timestamp='2025-01-01T18:05:00'
+    ))
     
     print("\n\n2. Conversation History is Tracked:")
     print("-" * 70)
     print(f"Stored {len(state.conversation_history)} turns")
     for turn in state.conversation_history:
-        print(f"\nTurn {turn['turn_number']}:")
-        print(f"  Player: {turn['player_action']}")
-        print(f"  DM: {turn['narration']}")
-        if turn['npc_speeches']:
-            for speech in turn['npc_speeches']:
+        print(f"\nTurn {turn.turn_number}:")
+        print(f"  Player: {turn.player_action}")
+        print(f"  DM: {turn.narration}")
+        if turn.npc_speeches:
+            for speech in turn.npc_speeches:
                 npc_name = npcs.get(speech['npc_id'], {}).get('name', speech['npc_id'])
                 print(f"  {npc_name}: \"{speech['text']}\"")
     
     print("\n\n3. Context Sent to LLM Includes Everything:")
     print("-" * 70)
-    context = DMPromptBuilder.game_context(state, max_history_turns=5)
+    sections = DMPromptBuilder.context_sections(state)
     
     # Show key sections
-    if "=== NPCs PRESENT ===" in context:
-        idx = context.index("=== NPCs PRESENT ===")
-        print(context[idx:idx+500])
+    if sections["world"].startswith("=== NPCs PRESENT ==="):
+        print(sections["world"][:500])
         print("\n... (NPC details continue) ...\n")
     
-    if "=== RECENT CONVERSATION HISTORY ===" in context:
-        idx = context.index("=== RECENT CONVERSATION HISTORY ===")
-        print(context[idx:idx+600])
+    if sections["history"]:
+        print(sections["history"].strip()[:600])
         print("\n... (conversation continues) ...")
     
     print("\n\n4. System Prompt Has NPC Personality Rules:")
@@ -123,8 +122,8 @@ Before Phase 3:
   - NPCs sound the same
 
 After Phase 3:
-  ✅ Last 10 full conversation turns stored
-  ✅ Last 5 turns sent to LLM in every prompt
+  ✅ Full conversation turns stored
+  ✅ Append-only window of 10-20 turns sent to LLM in every prompt
   ✅ NPCs have distinct personalities
   ✅ Relationships tracked and displayed
   ✅ LLM sees full dialogue context
@@ -5,7 +5,7 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from engine.state import GameState, Player, Location, Inventory
+from engine.state import ConversationTurn, GameState, Player, Location, Inventory
 from engine.response_parser import ResponseValidator
 from engine.response_schema import DMResponse, WorldEffect, NPCResponse
 import json
@@ -109,14 +109,14 @@ def test_commerce_validation():
     print("-" * 70)
     
     # Simulate buying stew in previous turn
-    state.conversation_history.append({
-        'turn_number': 1,
-        'player_action': 'I order stew',
-        'narration': 'Mira serves you a bowl of stew.',
-        'npc_speeches': [{'npc_id': 'bartender', 'text': "That's 5 gold.", 'emotion': 'neutral'}],
-        'effects_summary': ['💰 Gold: 50 → 45 (-5)', '📦 Gained: stew'],
-        'timestamp': '2025-01-01T12:00:00'
-    })
+    state.conversation_history.append(ConversationTurn(
+        turn_number=1,
+        player_action='I order stew',
+        narration='Mira serves you a bowl of stew.',
+        npc_speeches=[{'npc_id': 'bartender', 'text': "That's 5 gold.", 'emotion': 'neutral'}],
+        effects_summary=['💰 Gold: 50 → 45 (-5)', '📦 Gained: stew'],
+        timestamp='2025-01-01T12:00:00'
+    ))
     
     # Now try to buy same item again
     response4 = DMResponse(
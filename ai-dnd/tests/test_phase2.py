@@ -5,7 +5,9 @@ from engine.response_schema import DMResponse, NPCResponse, WorldEffect
 from engine.response_parser import ResponseParser, ResponseValidator
 from engine.state import GameState, Player, Location
 from engine.game_loop import GameEngine
-from datetime import datetime
+from datetime import datetime, timedelta
+from contextlib import redirect_stdout
+import io
 import json
 
 def test_parsing():
@@ -50,6 +52,12 @@ def test_parsing():
     parsed2 = ResponseParser.parse_response(test_json2)
     assert parsed2 is not None, "Failed to extract JSON from text"
     print("✅ JSON extracted from surrounding text")
+
+    test_json3 = 'Rolling {d20}... {"narration": "A brace } in text", "effects": {}} (end})'
+    parsed3 = ResponseParser.parse_response(test_json3)
+    assert parsed3 is not None, "Failed to skip stray braces around JSON"
+    assert parsed3.narration == "A brace } in text", "Brace inside string mis-scanned"
+    print("✅ Stray braces in prose ignored")
     
     print("\n" + "=" * 70)
     print("TEST 3: Fallback Response")
@@ -110,6 +118,14 @@ def test_validation():
     assert sanitized.effects.location is None, "Location not sanitized"
     print("✅ Invalid location sanitized to None")
 
+    # Name lookups follow a rename once the world is marked changed
+    assert ResponseValidator._find_npc_id("Mira", state) == "bartender"
+    state.npcs["bartender"]["name"] = "Mirabel"
+    state.mark_world_changed()
+    assert ResponseValidator._find_npc_id("Mirabel", state) == "bartender"
+    assert ResponseValidator._find_npc_id("Mira", state) is None
+    print("✅ Renamed NPC resolves by its new name")
+
 
 def test_effects():
     """Test effect application."""
@@ -131,6 +147,7 @@ def test_effects():
     )
     
     engine = GameEngine(state)
+    start_time = state.game_time
     
     # Apply effects
     effects = WorldEffect(
@@ -149,11 +166,96 @@ def test_effects():
     assert state.player.gold == 80, "Gold not updated correctly"
     assert "sword" in state.player.inventory.items, "Items not added"
     assert state.npc_relationships.get("bartender") == 0.3, "Relationship not updated"
+    assert state._time_iso is None, "Advancing time should not format game_time"
+    assert state.current_time() - datetime.fromisoformat(start_time) == timedelta(minutes=10)
+    assert state.game_time == state.current_time().isoformat(), "game_time should format on read"
     
     print("✅ All effects applied correctly")
     for log_entry in log:
         print(f"   {log_entry}")
 
+    # Present NPCs follow an in-place move once the world is marked changed
+    tavern = state.locations["tavern"]
+    tavern.npcs.append("bartender")
+    state.mark_world_changed()
+    assert engine._present_npc_ids(tavern) == ("bartender",)
+    tavern.npcs.remove("bartender")
+    tavern.npcs.append("stranger")
+    state.mark_world_changed()
+    assert engine._present_npc_ids(tavern) == ()
+    print("✅ Present NPCs rebuilt after a same-size change")
+
+
+def test_narration_streaming():
+    """Test echoing the narration from a streamed reply."""
+    from llm.client import OllamaClient
+    from ui.cli import NarrationEcho
+
+    print("\n" + "=" * 70)
+    print("TEST 6: Streamed Narration Echo")
+    print("=" * 70)
+
+    def echo_reply(reply: str, size: int) -> NarrationEcho:
+        echo = NarrationEcho()
+        with redirect_stdout(io.StringIO()):
+            for i in range(0, len(reply), size):
+                echo(reply[i:i + size])
+        return echo
+
+    # Escaped quotes, non-ASCII and an astral character (a surrogate pair),
+    # split at every chunk size including mid-escape
+    narration = 'The door "creaks" open.\nCafé \\ \U0001F600 done'
+    reply = json.dumps({"narration": narration, "npc_speeches": []})
+    assert "\\ud83d\\ude00" in reply
+    for size in (1, 2, 3, 5, 7, len(reply)):
+        echo = echo_reply(reply, size)
+        assert echo.done and echo.text == narration, (size, echo.text)
+    print("✓ Escapes and surrogate pairs decode at any chunk split")
+
+    # Malformed and lone-surrogate escapes are echoed as written
+    echo = echo_reply('{"narration": "a \\uZZ b \\ud83d c \\ude00 d"}', 1)
+    assert echo.done and echo.text == "a \\uZZ b \\ud83d c \\ude00 d", echo.text
+    print("✓ Malformed escapes are echoed verbatim")
+
+    # A failing on_token callback never costs the streamed reply
+    def broken(text):
+        raise UnicodeEncodeError("ascii", text, 0, 1, "boom")
+    parts = []
+    for line in (b'{"message": {"content": "{\\"narration\\": \\"hi\\"}"}}', b'{"done": true}'):
+        OllamaClient._handle_chunk(line, OllamaClient._chat_text, parts, broken)
+    assert "".join(parts) == '{"narration": "hi"}'
+    print("✓ Callback errors don't discard the reply")
+
+
+def test_response_cache():
+    """Test replaying an identical near-deterministic request."""
+    from llm.client import OllamaClient
+
+    print("\n" + "=" * 70)
+    print("TEST 7: Response Cache")
+    print("=" * 70)
+
+    client = OllamaClient()
+    calls = []
+    def chat(messages, **kwargs):
+        calls.append(messages)
+        return '{"narration": "The gate stays shut.", "effects": {}}'
+    client.chat = chat
+
+    messages = [{"role": "system", "content": "DM"},
+                {"role": "user", "content": "Turn: 3\nTime: 08:30\n\nPlayer action: knock"}]
+    first = client.chat_dm_response_with_retry(messages, "knock", temperature=0.0)
+    again = client.chat_dm_response_with_retry([dict(m) for m in messages], "knock", temperature=0.0)
+    assert first == again and len(calls) == 1
+    print("✓ An identical request within a turn is served from the cache")
+
+    # The next turn's prompt differs, and sampled calls are never cached
+    later = [messages[0], {"role": "user", "content": "Turn: 4\nTime: 08:40\n\nPlayer action: knock"}]
+    client.chat_dm_response_with_retry(later, "knock", temperature=0.0)
+    client.chat_dm_response_with_retry(messages, "knock", temperature=0.8)
+    assert len(calls) == 3
+    print("✓ Other turns and sampled calls go to the model")
+
 
 def main():
     """Run all tests."""
@@ -163,6 +265,8 @@ def main():
         test_parsing()
         test_validation()
         test_effects()
+        test_narration_streaming()
+        test_response_cache()
         
         print("\n" + "=" * 70)
         print("🎉 ALL TESTS PASSED!")
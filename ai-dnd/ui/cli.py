@@ -1,25 +1,177 @@
 """Command-line interface for the game."""
 
+import asyncio
+import heapq
 import os
+import re
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from engine.state import GameState, Location
 from engine.game_loop import GameEngine
 from engine.response_parser import ResponseParser, ResponseValidator
+from engine.response_schema import NPCResponse, now_iso
 from llm.client import OllamaClient
-from llm.prompts import DMPromptBuilder
+from llm.prompts import DMPromptBuilder, MEMORY_EMOTION_ICONS
+
+
+# NPC speech emotion -> emoji shown next to the speaker's name
+_SPEECH_EMOTION_EMOJI = {
+    'friendly': '😊', 'joy': '😄', 'happy': '😊', 'cheerful': '😀',
+    'angry': '😠', 'furious': '😡', 'annoyed': '😒',
+    'fear': '😨', 'worried': '😟', 'nervous': '😰',
+    'sad': '😢', 'melancholy': '😔', 'depressed': '😞',
+    'surprise': '😲', 'shocked': '😱', 'amazed': '🤩',
+    'neutral': '😐', 'calm': '😌',
+    'suspicious': '🤨', 'distrustful': '🧐',
+    'grateful': '🙏', 'thankful': '🥰',
+    'gruff': '😤', 'stern': '😑',
+    'curious': '🤔', 'interested': '👀',
+    'confused': '😕', 'puzzled': '🤷',
+    'excited': '🤗', 'enthusiastic': '😆',
+    'secretive': '🤫', 'mysterious': '🎭',
+    'compassionate': '🥺', 'caring': '💝',
+}
+
+_NARRATION_START = re.compile(r'"narration"\s*:\s*"')
+_JSON_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f'}
+_HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+
+
+class NarrationEcho:
+    """on_token callback that prints the reply's "narration" string as it streams in.
+
+    Only the first narration seen is echoed, so retries and the rest of the
+    JSON stay hidden; text holds what was printed. Surrogate pairs are
+    joined; escapes that don't decode are echoed as written.
+    """
+
+    def __init__(self):
+        self._buffer = ""  # raw reply text until the narration starts
+        self._escape = None  # pending escape: "" after a backslash, "u" + hex digits after \u
+        self._high = None  # (code, raw text) of a \u high surrogate awaiting its low half
+        self.started = False
+        self.done = False
+        self.text = ""
+
+    def _flush_high(self, out: list):
+        """Echo an unpaired high surrogate as written."""
+        if self._high is not None:
+            out.append(self._high[1])
+            self._high = None
+
+    def _decode_unicode(self, out: list):
+        """Decode a complete \\uXXXX escape held in _escape."""
+        raw, code = "\\" + self._escape, int(self._escape[1:], 16)
+        self._escape = None
+        if 0xDC00 <= code < 0xE000 and self._high is not None:
+            high = self._high[0]
+            self._high = None
+            out.append(chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00)))
+            return
+        self._flush_high(out)
+        if 0xD800 <= code < 0xDC00:
+            self._high = (code, raw)
+        elif 0xDC00 <= code < 0xE000:
+            out.append(raw)  # lone low surrogate
+        else:
+            out.append(chr(code))
+
+    def __call__(self, chunk: str):
+        if self.done:
+            return
+        if not self.started:
+            self._buffer += chunk
+            match = _NARRATION_START.search(self._buffer)
+            if not match:
+                return
+            self.started = True
+            chunk, self._buffer = self._buffer[match.end():], ""
+            print("\n" + "=" * 70)
+            print("[DM]")
+        out = []
+        for char in chunk:
+            if self._escape == "":
+                if char == 'u':
+                    self._escape = 'u'
+                    continue
+                self._flush_high(out)
+                out.append(_JSON_ESCAPES.get(char, char))
+                self._escape = None
+                continue
+            if self._escape is not None:
+                if char in _HEX_DIGITS:
+                    self._escape += char
+                    if len(self._escape) == 5:  # u + 4 hex digits
+                        self._decode_unicode(out)
+                    continue
+                # Malformed \u escape: echo it as written, then read char normally
+                self._flush_high(out)
+                out.append("\\" + self._escape)
+                self._escape = None
+            if char == '\\':
+                self._escape = ""
+            elif char == '"':
+                self._flush_high(out)
+                self.done = True
+                break
+            else:
+                self._flush_high(out)
+                out.append(char)
+        text = "".join(out)
+        self.text += text
+        sys.stdout.write(text + ("\n" if self.done else ""))
+        sys.stdout.flush()
 
 
 class GameCLI:
     """Command-line interface for playing the game."""
 
-    def __init__(self, llm_client: OllamaClient, engine: GameEngine):
+    def __init__(self, llm_client: OllamaClient, engine: GameEngine, parallel_npc_dialog: bool = False):
         self.llm = llm_client
         self.engine = engine
         self.running = True
+        # Re-voice each speaking NPC with its own concurrent LLM call; only
+        # pays off against a backend that serves requests in parallel
+        self.parallel_npc_dialog = parallel_npc_dialog
+        # Event loop for the async LLM calls, kept (with the client's aiohttp
+        # session bound to it) for the CLI's lifetime; created on first use
+        self._loop = None
+        # LLM calls made off the turn (see refresh_history_summary); the client
+        # gives this thread its own HTTP session
+        self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cli-background")
+        self._summary_job = None  # (state, turns covered, future) of the summary being written
+        # Menu keys answered locally; anything else goes to the LLM
+        self._local_actions = {
+            "3": self.show_inventory,
+            "4": self.show_quests,
+            "7": self.save_game,
+            "8": self.load_game,
+            "9": self.display_memories,  # Phase 4
+        }
+
+    def close(self):
+        """Stop background work and the async session; an unfinished history summary is dropped."""
+        self._background.shutdown(wait=False, cancel_futures=True)
+        if self._loop is not None:
+            self._loop.run_until_complete(self.llm.aclose())
+            self._loop.close()
+            self._loop = None
+
+    def _run_async(self, coro):
+        """Run coro to completion on the CLI's event loop."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
 
     def clear_screen(self):
         """Clear terminal screen."""
-        os.system("cls" if os.name == "nt" else "clear")
+        if os.name == "nt":
+            os.system("cls")
+        else:
+            # ANSI clear + cursor home; no shell spawned per redraw
+            sys.stdout.write("\x1b[2J\x1b[H")
+            sys.stdout.flush()
 
     def display_header(self):
         """Display game header."""
@@ -100,50 +252,50 @@ class GameCLI:
 
     def handle_quick_action(self, action: str) -> bool:
         """
-        Handle predefined quick actions. Returns True if handled, False if custom.
+        Handle predefined quick actions. Returns True if the LLM should still
+        handle the action (look, talk, rest, custom), False if it was handled here.
         """
-        state = self.engine.state
-
-        if action == "1":  # Look
-            return True  # LLM will handle
-        elif action == "2":  # Talk
-            return True  # LLM will handle
-        elif action == "3":  # Inventory
-            print("\n[INVENTORY]")
-            if state.player.inventory.items:
-                for item, qty in state.player.inventory.items.items():
-                    print(f"  {item}: {qty}")
-            else:
-                print("  (empty)")
-            return False  # Don't call LLM
-        elif action == "4":  # Quests
-            print("\n[QUESTS]")
-            if state.active_quests:
-                for qid, quest in state.active_quests.items():
-                    status = "✓ DONE" if quest.completed else "[ ]"
-                    print(f"  {status} {quest.title}")
-                    print(f"      {quest.description}")
-            else:
-                print("  (no active quests)")
-            return False  # Don't call LLM
-        elif action == "5":  # Rest
+        handler = self._local_actions.get(action)
+        if handler is None:
             return True  # LLM will handle
-        elif action == "7":  # Save
-            self.engine.state.save_to_file("data/save_state.json")
-            print("[Game saved]")
-            return False
-        elif action == "8":  # Load
-            try:
-                self.engine.state = GameState.load_from_file("data/save_state.json")
-                print("[Game loaded]")
-            except Exception as e:
-                print(f"[Load failed: {e}]")
-            return False
-        elif action == "9":  # View memories (Phase 4)
-            self.display_memories()
-            return False
+        handler()
+        return False  # Don't call LLM
+
+    def show_inventory(self):
+        """Quick action 3: list the player's items."""
+        print("\n[INVENTORY]")
+        items = self.engine.state.player.inventory.items
+        if items:
+            for item, qty in items.items():
+                print(f"  {item}: {qty}")
         else:
-            return True  # Custom action, let LLM handle
+            print("  (empty)")
+
+    def show_quests(self):
+        """Quick action 4: list active quests."""
+        print("\n[QUESTS]")
+        quests = self.engine.state.active_quests
+        if quests:
+            for quest in quests.values():
+                status = "✓ DONE" if quest.completed else "[ ]"
+                print(f"  {status} {quest.title}")
+                print(f"      {quest.description}")
+        else:
+            print("  (no active quests)")
+
+    def save_game(self):
+        """Quick action 7."""
+        self.engine.state.save_to_file("data/save_state.json")
+        print("[Game saved]")
+
+    def load_game(self):
+        """Quick action 8."""
+        try:
+            self.engine.state = GameState.load_from_file("data/save_state.json")
+            self.engine.unsummarized_turns.clear()
+            print("[Game loaded]")
+        except Exception as e:
+            print(f"[Load failed: {e}]")
     
     def display_memories(self):
         """Display memories for NPCs in current location (Phase 4)."""
@@ -157,8 +309,9 @@ class GameCLI:
             print("\n[MEMORIES] Memory system not available. Install with: pip install chromadb sentence-transformers")
             return
         
-        if not state.memory_store:
-            print("\n[MEMORIES] Memory system not initialized.")
+        store = state.existing_memory_store
+        if store is None:
+            print("\n[MEMORIES] No memories yet.")
             return
         
         location = self.engine.get_current_location()
@@ -171,7 +324,7 @@ class GameCLI:
         print("=" * 70)
         
         # Get memory stats
-        stats = state.memory_store.get_memory_stats()
+        stats = store.get_memory_stats()
         print(f"\nTotal memories: {stats['total_memories']} (Episodic: {stats['episodic_memories']}, Semantic: {stats['semantic_memories']})")
         print(f"ChromaDB: {'Enabled' if stats['chromadb_enabled'] else 'Disabled'}")
         
@@ -181,30 +334,32 @@ class GameCLI:
                 continue
             
             npc_name = state.npcs[npc_id].get('name', npc_id)
-            memories = state.memory_store.get_npc_memories(npc_id)
+            memories = store.get_npc_memories(npc_id)
             
             if memories:
                 print(f"\n--- {npc_name}'s Memories ({len(memories)}) ---")
                 
-                # Sort by importance/confidence
-                episodic_mems = [m for m in memories if isinstance(m, EpisodicMemory)]
-                semantic_mems = [m for m in memories if isinstance(m, SemanticMemory)]
-                
-                episodic_mems.sort(key=lambda m: m.importance * m.current_strength, reverse=True)
-                semantic_mems.sort(key=lambda m: m.confidence, reverse=True)
+                # Top 5 of each kind by importance/confidence
+                episodic_mems = heapq.nlargest(
+                    5, (m for m in memories if isinstance(m, EpisodicMemory)),
+                    key=lambda m: m.importance * m.current_strength
+                )
+                semantic_mems = heapq.nlargest(
+                    5, (m for m in memories if isinstance(m, SemanticMemory)),
+                    key=lambda m: m.confidence
+                )
                 
                 if episodic_mems:
                     print("\nEpisodic Memories (experiences):")
-                    for mem in episodic_mems[:5]:  # Show top 5
-                        emotion_icon = {"gratitude": "🙏", "fear": "😨", "anger": "😠", 
-                                       "joy": "😊", "sadness": "😢", "neutral": "😐"}.get(mem.emotion, "")
+                    for mem in episodic_mems:
+                        emotion_icon = MEMORY_EMOTION_ICONS.get(mem.emotion, "")
                         strength_pct = int(mem.current_strength * 100)
                         importance = "⭐" * int(mem.importance * 3)
                         print(f"  {emotion_icon} [{importance} {strength_pct}%] {mem.text}")
                 
                 if semantic_mems:
                     print("\nSemantic Memories (facts):")
-                    for mem in semantic_mems[:5]:  # Show top 5
+                    for mem in semantic_mems:
                         confidence_pct = int(mem.confidence * 100)
                         print(f"  📝 [{mem.fact_type}, {confidence_pct}%] {mem.text}")
             else:
@@ -254,81 +409,79 @@ class GameCLI:
         state = self.engine.state
 
         # Quick action handling
-        if player_action[0] in "12345678" or player_action.lower() in ["q"]:
-            if not self.handle_quick_action(player_action):
-                return True
+        if not self.handle_quick_action(player_action):
+            return True
+        timestamp = now_iso()  # shared by every record this turn makes
 
-        # Get DM response with retry logic
-        system_prompt, user_prompt = DMPromptBuilder.construct_full_prompt(
-            state, player_action
-        )
+        # Pick up a history summary finished since the last turn
+        self.refresh_history_summary()
+
+        # Get DM response with retry logic (cache-friendly message layout)
+        messages = DMPromptBuilder.construct_messages(state, player_action)
 
         print("\n[Thinking...]")
-        raw_response = self.llm.generate_dm_response_with_retry(
-            system_prompt=system_prompt,
-            game_context=DMPromptBuilder.game_context(state),
+        echo = NarrationEcho()  # shows the narration while the rest of the reply streams
+        raw_response = self.llm.chat_dm_response_with_retry(
+            messages=messages,
             player_input=player_action,
             temperature=0.8,
             max_retries=2,
+            on_token=echo,
         )
+        if echo.started and not echo.done:
+            print()
 
         # Parse JSON response
         parsed = ResponseParser.parse_response(raw_response)
         
         if not parsed:
             print("\n[WARNING] Could not parse LLM response, using fallback")
-            parsed = ResponseParser.create_fallback_response(player_action)
+            parsed = ResponseParser.create_fallback_response(player_action, timestamp)
 
         # Validate and sanitize
-        is_valid, issues = ResponseValidator.validate_dm_response(parsed, state)
+        context = ResponseValidator.prepare_response(parsed, state)
+        is_valid, issues = ResponseValidator.validate_dm_response(parsed, state, context)
         if not is_valid:
             print(f"\n[WARNING] Response validation issues: {len(issues)} found")
             for issue in issues[:3]:  # Show first 3 issues
                 print(f"  - {issue}")
-            parsed = ResponseValidator.sanitize_effects(parsed, state)
+            parsed = ResponseValidator.sanitize_effects(parsed, state, context)
 
         # Confirm effects; if declined, abort turn without changes or narration
         if not self.confirm_effects(parsed.effects, state):
             print("\n[INFO] Action canceled; nothing happens.")
             return True
 
+        # Re-voice NPCs only for a turn that goes ahead
+        if self.parallel_npc_dialog and len(parsed.npc_speeches) > 1:
+            parsed.npc_speeches = self.regenerate_npc_speeches(parsed.npc_speeches, player_action)
+
         # Process turn and apply effects to game state
         self.engine.process_turn(player_action)
         effect_log = self.engine.apply_effects(
             parsed.effects,
             player_action=player_action,
             narration=parsed.narration,
-            npc_speeches=[speech.__dict__ for speech in parsed.npc_speeches]
+            npc_speeches=[speech.to_dict() for speech in parsed.npc_speeches],
+            timestamp=timestamp,
         )
+        self.refresh_history_summary()
 
-        # Display narration
-        print("\n" + "=" * 70)
-        print("[DM]")
-        print(parsed.narration)
+        # Turn output is collected and written in one go
+        lines = []
+
+        # Display narration (unless it was already shown as it streamed)
+        if echo.text != parsed.narration or not echo.done:
+            lines += ["\n" + "=" * 70, "[DM]", parsed.narration]
 
         # Display NPC speeches
         if parsed.npc_speeches:
-            print("\n" + "-" * 70)
+            lines.append("\n" + "-" * 70)
             for npc_speech in parsed.npc_speeches:
                 npc_name = state.npcs.get(npc_speech.npc_id, {}).get('name', npc_speech.npc_id)
                 
                 # Enhanced emotion emojis
-                emotion_emoji = {
-                    'friendly': '😊', 'joy': '😄', 'happy': '😊', 'cheerful': '😀',
-                    'angry': '😠', 'furious': '😡', 'annoyed': '😒',
-                    'fear': '😨', 'worried': '😟', 'nervous': '😰',
-                    'sad': '😢', 'melancholy': '😔', 'depressed': '😞',
-                    'surprise': '😲', 'shocked': '😱', 'amazed': '🤩',
-                    'neutral': '😐', 'calm': '😌',
-                    'suspicious': '🤨', 'distrustful': '🧐',
-                    'grateful': '🙏', 'thankful': '🥰',
-                    'gruff': '😤', 'stern': '😑',
-                    'curious': '🤔', 'interested': '👀',
-                    'confused': '😕', 'puzzled': '🤷',
-                    'excited': '🤗', 'enthusiastic': '😆',
-                    'secretive': '🤫', 'mysterious': '🎭',
-                    'compassionate': '🥺', 'caring': '💝'
-                }.get(npc_speech.emotion.lower(), '💬')
+                emotion_emoji = _SPEECH_EMOTION_EMOJI.get(npc_speech.emotion.lower(), '💬')
                 
                 # Get NPC's personality archetype for styling
                 archetype = ""
@@ -337,34 +490,83 @@ class GameCLI:
                     archetype = traits.get('archetype', '')
                 
                 # Display with emotion and archetype context
-                print(f"\n{npc_name} {emotion_emoji} [{npc_speech.emotion}]")
-                print(f'  "{npc_speech.text}"')
+                lines.append(f"\n{npc_name} {emotion_emoji} [{npc_speech.emotion}]")
+                lines.append(f'  "{npc_speech.text}"')
                 
                 # Add visual separator for multiple NPCs
                 if len(parsed.npc_speeches) > 1:
-                    print()
+                    lines.append("")
 
         # Display effects
         if effect_log:
-            print("\n" + "-" * 70)
-            print("[EFFECTS]")
-            for log_entry in effect_log:
-                print(f"  {log_entry}")
+            lines += ["\n" + "-" * 70, "[EFFECTS]"]
+            lines.extend(f"  {log_entry}" for log_entry in effect_log)
 
         # Display suggested options
         if parsed.suggested_options:
-            print("\n" + "-" * 70)
-            print("[SUGGESTIONS]")
-            for i, option in enumerate(parsed.suggested_options, 1):
-                print(f"  {i}. {option}")
+            lines += ["\n" + "-" * 70, "[SUGGESTIONS]"]
+            lines.extend(f"  {i}. {option}" for i, option in enumerate(parsed.suggested_options, 1))
 
-        print("=" * 70)
+        lines.append("=" * 70)
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
 
         # Store narration for display on next turn
         state.last_narration = parsed.narration
 
         return True
 
+    def regenerate_npc_speeches(self, speeches, player_action: str):
+        """
+        Regenerate the DM's NPC speeches with one concurrent call per NPC.
+
+        The DM response still decides who speaks; NPCs whose call fails keep
+        the DM's line.
+        """
+        state = self.engine.state
+        prompts = {
+            speech.npc_id: DMPromptBuilder.npc_only_prompt(state, speech.npc_id, player_action)
+            for speech in speeches if speech.npc_id in state.npcs
+        }
+
+        replies = self._run_async(self.llm.agenerate_npc_speeches(prompts))
+        voiced = {speech["npc_id"]: speech for speech in replies}
+        return [NPCResponse(**voiced[speech.npc_id]) if speech.npc_id in voiced else speech
+                for speech in speeches]
+
+    def refresh_history_summary(self):
+        """
+        Fold turns that left the history window into state.history_summary.
+
+        The LLM call runs in the background and a later call applies its
+        result, so the turn that queued the turns shows its narration without
+        waiting on it; the summary lands on a following turn. A local Ollama
+        serves one request at a time, so a DM call sent while the summary is
+        still being written queues behind it on the server. Turns only queue
+        after a window reset, so the summary (and the prompt prefix it sits
+        in) stays fixed between resets. On an LLM error the turns stay queued
+        and are summarized again.
+        """
+        state = self.engine.state
+        turns = self.engine.unsummarized_turns
+        if self._summary_job is not None:
+            job_state, covered, future = self._summary_job
+            if not future.done():
+                return
+            self._summary_job = None
+            summary = future.result()
+            # A summary for a state replaced since (e.g. by a load) is dropped
+            if job_state is state and summary and not summary.startswith("[ERROR]"):
+                state.history_summary = summary
+                del turns[:covered]
+
+        if turns:
+            system, prompt = DMPromptBuilder.summary_prompt(state, turns)
+            future = self._background.submit(
+                self.llm.generate, prompt, temperature=0.2, max_tokens=256, system=system
+            )
+            self._summary_job = (state, len(turns), future)
+
     def main_loop(self):
         """Main game loop."""
         state = self.engine.state
@@ -379,6 +581,9 @@ class GameCLI:
             response = input("Continue anyway? (y/n): ").lower()
             if response != "y":
                 return
+        else:
+            # Load the model while the player reads the first screen
+            threading.Thread(target=self.llm.warm_up, daemon=True).start()
 
         # Main loop
         while self.running: